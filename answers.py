@@ -0,0 +1,170 @@
+import re
+from collections import namedtuple
+
+# Server-side answer checking, with the same rules as checkAnswer() in main.js.
+# The accepted answers of every vocabulary entry are normalized once when the
+# vocabulary is loaded, so checking an answer is one normalization of the
+# user's input and a set lookup.
+
+AnswerKey = namedtuple(
+    "AnswerKey",
+    "english german german_loose german_umlauts plural plural_loose plural_umlauts"
+)
+
+PARENS = re.compile(r"\(.*?\)")
+ARTICLE = re.compile(r"^(der|die|das)\s+", re.IGNORECASE)
+LEADING_TO = re.compile(r"^to\s+(?=[a-zA-Z])")
+UMLAUTS = "äöü"
+
+GERMAN_CHARS = str.maketrans({"ä": "a", "ö": "o", "ü": "u", "ß": "ss", "?": None, "'": None})
+ENGLISH_CHARS = str.maketrans({"'": None, ",": None, "?": None})
+
+
+def normalize_german(s):
+    return PARENS.sub("", s.lower().translate(GERMAN_CHARS))
+
+
+def normalize_german_loose(s):
+    # Without articles or anything in parentheses (strict articles off)
+    return normalize_german(ARTICLE.sub("", PARENS.sub("", s)))
+
+
+def normalize_english(s):
+    s = s.strip().lower()
+
+    if s.startswith("the "):
+        s = s[4:]
+    if s.startswith("to "):
+        s = s[3:]
+
+    return PARENS.sub("", s.translate(ENGLISH_CHARS)).strip()
+
+
+def prepare_input(answer):
+    # What checkAnswer() does to the typed text before comparing it
+    s = answer.strip().lower()
+    s = LEADING_TO.sub("", s)
+    return PARENS.sub("", s.replace("?", ""))
+
+
+def split_forms(raw):
+    return [s.strip() for s in raw.lower().strip().split("/")]
+
+
+def answer_key(entry):
+    german = split_forms(entry.german)
+    plural = split_forms(entry.plural) if entry.plural else None
+
+    return AnswerKey(
+        english=frozenset(normalize_english(c) for c in split_forms(entry.english)),
+        german=frozenset(normalize_german(c) for c in german),
+        german_loose=frozenset(normalize_german_loose(c) for c in german),
+        german_umlauts="".join(u for u in UMLAUTS if u in german[0]),
+        plural=frozenset(normalize_german(c) for c in plural) if plural else None,
+        plural_loose=frozenset(normalize_german_loose(c) for c in plural) if plural else None,
+        plural_umlauts="".join(u for u in UMLAUTS if u in plural[0]) if plural else None,
+    )
+
+
+def check(key, answer, mode, strict=False, plurals=False, force_umlauts=False):
+    user = prepare_input(answer)
+
+    if mode != "en-to-de":
+        return normalize_english(user) in key.english
+
+    if plurals and key.plural is not None:
+        forms, loose, umlauts = key.plural, key.plural_loose, key.plural_umlauts
+    else:
+        forms, loose, umlauts = key.german, key.german_loose, key.german_umlauts
+
+    if strict:
+        correct = normalize_german(user) in forms
+    else:
+        correct = normalize_german_loose(user) in loose
+
+    # Force umlauts: "schon" doesn't count for "schön"
+    if correct and force_umlauts:
+        correct = all(u in user for u in umlauts)
+
+    return correct
+
+
+def check_any_settings(key, answer, mode):
+    # Accepted under at least one combination of the quiz settings.
+    # Used to verify submitted scores, where the settings may have changed
+    # since the quiz started.
+    if mode != "en-to-de":
+        return check(key, answer, mode)
+
+    return any(
+        check(key, answer, mode, strict=strict, plurals=plurals)
+        for strict in (False, True)
+        for plurals in (False, True)
+    )
+
+
+class AnswerIndex:
+    # German word -> [(level, category, AnswerKey)] for every entry with that word
+
+    def __init__(self, entries=()):
+        self.load(entries)
+
+    def load(self, entries):
+        by_word = {}
+        for entry in entries:
+            by_word.setdefault(entry.german, []).append((entry.level, entry.category, answer_key(entry)))
+        self.by_word = by_word
+
+    def keys(self, word, categories=None, category=None):
+        # categories: allowed (level, category) pairs, category: the one the client named
+        # Yields (position in by_word[word], (level, category), AnswerKey)
+        for i, (level, cat, key) in enumerate(self.by_word.get(word, ())):
+            if categories is not None and (level, cat) not in categories:
+                continue
+            if category is not None and cat != category:
+                continue
+            yield i, (level, cat), key
+
+    def match(self, item, mode, categories=None, used=(), **settings):
+        # item: {"word": <German word>, "answer": <typed text>, "category": optional}
+        # Returns ((word, position), (level, category)) for the first entry not in
+        # `used` that accepts the answer, or None
+        if not isinstance(item, dict):
+            return None
+
+        word = item.get("word")
+        answer = item.get("answer")
+        if not isinstance(word, str) or not isinstance(answer, str):
+            return None
+
+        category = item.get("category") if isinstance(item.get("category"), str) else None
+
+        for i, where, key in self.keys(word, categories, category):
+            if (word, i) in used:
+                continue
+            if settings:
+                correct = check(key, answer, mode, **settings)
+            else:
+                correct = check_any_settings(key, answer, mode)
+            if correct:
+                return (word, i), where
+
+        return None
+
+    def check_item(self, item, mode, categories=None, **settings):
+        # Returns the (level, category) the answer was correct for, or None
+        found = self.match(item, mode, categories, **settings)
+        return found[1] if found is not None else None
+
+    def score(self, answers, mode, categories):
+        # Number of entries from `categories` answered correctly. Each entry counts
+        # once, so "sie" (she) and "sie" (they) are two points, but sending the
+        # same answer twice is one.
+        used = set()
+
+        for item in answers:
+            found = self.match(item, mode, categories, used)
+            if found is not None:
+                used.add(found[0])
+
+        return len(used)
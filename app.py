@@ -1,13 +1,31 @@
-import sqlite3, re, os, json, uuid, time
+import re, os, io, json, math, uuid, time, threading, hashlib, hmac, mimetypes, multiprocessing
 import psycopg2
 from psycopg2.extras import RealDictCursor
 from flask import Flask, render_template, session, g, request, redirect, url_for, flash, jsonify, send_from_directory
 from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.utils import secure_filename
-from datetime import datetime, timedelta, date
-from PIL import Image, ImageOps, ImageDraw
+from werkzeug.utils import send_from_directory as send_upload
+from werkzeug.security import safe_join
+from flask.sessions import SecureCookieSessionInterface
+from datetime import timedelta, date
+from functools import partial, wraps
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from PIL import Image
 from flask_compress import Compress
 from flask_wtf import CSRFProtect
+from flask_wtf.csrf import generate_csrf
+from db_pool import ConnectionPool, sqlite_connect
+from cache import TTLCache, RedisCache
+from rankings import MemoryRanking, RedisRanking
+from vocab import VocabStore, entry_to_dict
+from answers import AnswerIndex
+from migrations import migrate
+from queries import PreparingConnection, compile_sql, run_named, run_batch
+from avatars import AVATAR_SIZES, avatar_variants, variant_name, process_avatar
+from srs import DEFAULT_EASE, schedule, utcnow
+from metrics import Metrics, query_label
+from assets import build as build_assets, load_manifest
 
 app = Flask(__name__)
 Compress(app)
@@ -16,6 +34,8 @@ csrf = CSRFProtect(app)
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from limits.storage import RedisStorage
+from limits import RateLimitItemPerMinute, parse as parse_limit
+from limits.strategies import FixedWindowRateLimiter
 
 redis_url = os.getenv("REDIS_URL")
 
@@ -31,11 +51,61 @@ limiter = Limiter(
     default_limits=[]
 )
 
+# Failed logins are counted per username in the limiter storage (Redis or memory),
+# so the count is shared between workers and can't be reset by dropping a cookie
+LOGIN_MAX_FAILURES = 5
+login_failures = RateLimitItemPerMinute(LOGIN_MAX_FAILURES)
+failure_limiter = FixedWindowRateLimiter(limiter.storage)
+
+# The JSON API routes that asgi.py also serves are limited per user (per IP when
+# logged out) in the same storage, so both serving modes share one count
+API_RATE_LIMIT = parse_limit(os.getenv("API_RATE_LIMIT", "120 per minute"))
+api_limiter = FixedWindowRateLimiter(limiter.storage)
+
+def api_retry_after(session, remote_addr):
+    # Counts this request; seconds until the client may retry, None if it's allowed
+    key = f"user:{session['user_id']}" if "user_id" in session else f"ip:{remote_addr}"
+    if api_limiter.hit(API_RATE_LIMIT, "api", key):
+        return None
+    reset_time = api_limiter.get_window_stats(API_RATE_LIMIT, "api", key).reset_time
+    return max(1, int(reset_time - time.time()) + 1)
+
+def api_rate_limit(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        retry_after = api_retry_after(session, request.remote_addr)
+        if retry_after is not None:
+            response = jsonify({"error": "rate_limited"})
+            response.headers["Retry-After"] = str(retry_after)
+            return response, 429
+        return view(*args, **kwargs)
+    return wrapper
+
+@app.before_request
+def start_request_timer():
+    if METRICS_ENABLED:
+        g.request_start = time.perf_counter()
+        g.query_count = 0
+
+@app.after_request
+def record_request_metrics(response):
+    if "request_start" in g:
+        # Route pattern, not the path, so /u/<username> is one series
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        metrics.observe_request(
+            request.method, route, response.status_code,
+            time.perf_counter() - g.request_start, g.query_count
+        )
+    return response
+
+def needs_https(host, forwarded_proto):
+    # Render terminates TLS and forwards the original scheme
+    return "onrender.com" in host and forwarded_proto == "http"
+
 @app.before_request
 def enforce_https():
-    if "onrender.com" in request.host:
-        if request.headers.get("X-Forwarded-Proto", "http") == "http":
-            return redirect(request.url.replace("http://", "https://"))
+    if needs_https(request.host, request.headers.get("X-Forwarded-Proto", "http")):
+        return redirect(request.url.replace("http://", "https://"))
 
 app.secret_key = os.getenv("SECRET_KEY", "fallback-secret")
 
@@ -48,6 +118,97 @@ ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "gif", "webp"}
 def allowed_file(filename):
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
 
+# Avatar processing runs in a small process pool (see avatars.py)
+AVATAR_WORKERS = int(os.getenv("AVATAR_WORKERS", "1"))
+AVATAR_MAX_PENDING = int(os.getenv("AVATAR_MAX_PENDING", "8"))
+AVATAR_MAX_BYTES = int(os.getenv("AVATAR_MAX_BYTES", str(8 * 1024 * 1024)))
+AVATAR_MAX_PIXELS = int(os.getenv("AVATAR_MAX_PIXELS", str(24_000_000)))
+
+# Let the front proxy send avatar files: nginx internal location (X-Accel-Redirect)
+# or X-Sendfile (Apache / lighttpd)
+AVATAR_ACCEL_PREFIX = os.getenv("AVATAR_ACCEL_PREFIX")
+AVATAR_X_SENDFILE = os.getenv("AVATAR_X_SENDFILE") == "1"
+
+_avatar_pool = None
+_avatar_pool_pid = None
+_avatar_pending = 0
+_avatar_lock = threading.Lock()
+
+def get_avatar_pool():
+    global _avatar_pool, _avatar_pool_pid
+
+    # Same as the DB pool: one per worker process, created on first use
+    with _avatar_lock:
+        if _avatar_pool is None or _avatar_pool_pid != os.getpid():
+            # forkserver: children don't inherit the web worker's threads and sockets
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            _avatar_pool = ProcessPoolExecutor(max_workers=AVATAR_WORKERS, mp_context=context)
+            _avatar_pool_pid = os.getpid()
+
+    return _avatar_pool
+
+def submit_avatar(*args):
+    global _avatar_pool
+
+    pool = get_avatar_pool()
+    try:
+        return pool.submit(process_avatar, *args)
+    except BrokenProcessPool:
+        # A worker died before avatar_done() noticed; start a new pool and retry once
+        with _avatar_lock:
+            if _avatar_pool is pool:
+                _avatar_pool = None
+        return get_avatar_pool().submit(process_avatar, *args)
+
+def remove_avatar_files(filename):
+    for name in avatar_variants(filename) + [f"{filename}.upload"]:
+        try:
+            os.remove(os.path.join(UPLOAD_FOLDER, name))
+        except OSError:
+            pass
+
+def avatar_done(user_id, filename, future):
+    # Runs in a background thread of the web worker once the image is processed
+    global _avatar_pool, _avatar_pending
+
+    with _avatar_lock:
+        _avatar_pending -= 1
+
+    try:
+        future.result()
+    except Exception as e:
+        print("Avatar processing error:", e)
+        remove_avatar_files(filename)
+
+        # A crashed worker breaks the whole pool; start a new one on the next upload
+        if isinstance(e, BrokenProcessPool):
+            with _avatar_lock:
+                _avatar_pool = None
+        return
+
+    try:
+        with app.app_context():
+            db = get_db()
+            old = execute(db, "SELECT avatar FROM users WHERE id = %s", (user_id,)).fetchone()
+
+            if old is None:
+                # Account was deleted in the meantime
+                remove_avatar_files(filename)
+                return
+
+            execute(db, "UPDATE users SET avatar = %s WHERE id = %s", (filename, user_id))
+            db.commit()
+
+        invalidate_user_cache(user_id)
+
+        if old["avatar"] and old["avatar"] != filename:
+            remove_avatar_files(old["avatar"])
+
+    except Exception as e:
+        print("Avatar update error:", e)
+        remove_avatar_files(filename)
+
 # Secure session cookies
 app.config["SESSION_COOKIE_HTTPONLY"] = True
 app.config["SESSION_COOKIE_SAMESITE"] = "Lax"
@@ -55,122 +216,397 @@ app.config["SESSION_COOKIE_SECURE"] = True
 app.config["SESSION_PERMANENT"] = True
 app.config["PERMANENT_SESSION_LIFETIME"] = timedelta(days=30)
 
+# Long-cached responses shouldn't refresh the session cookie:
+# shared caches don't store responses with Set-Cookie
+NO_SESSION_REFRESH = {"uploaded_file", "asset_file"}
+
+class SessionInterface(SecureCookieSessionInterface):
+    def should_set_cookie(self, app, session):
+        if request.endpoint in NO_SESSION_REFRESH:
+            return session.modified
+        return super().should_set_cookie(app, session)
+
+app.session_interface = SessionInterface()
+
 # Enable CSRF
 app.config["WTF_CSRF_ENABLED"] = True
 app.config["SECRET_KEY"] = os.getenv("SECRET_KEY", "fallback-secret")
 
+# PostgreSQL on Render (DATABASE_URL set), SQLite for local development
+DB_DIALECT = "postgres" if "DATABASE_URL" in os.environ else "sqlite"
+
+# Local SQLite database file
+SQLITE_PATH = os.getenv("SQLITE_PATH", "database/users.db")
+
+# Server-side prepared statements for named queries (turn off behind PgBouncer)
+DB_PREPARE = os.getenv("DB_PREPARE", "1") == "1"
+
+# Request / query metrics at /metrics (METRICS_ENABLED=0 turns all timing off)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+LOOPBACK_ADDRESSES = ("127.0.0.1", "::1")
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+
+metrics = Metrics()
+
+def record_query(label, start):
+    elapsed = time.perf_counter() - start
+    slow = elapsed * 1000 >= SLOW_QUERY_MS
+    metrics.observe_query(label, elapsed, slow)
+
+    if slow:
+        print(f"Slow query ({elapsed * 1000:.0f} ms):", label)
+    if "query_count" in g:
+        g.query_count += 1
+
 def execute(db, query, params=()):
+    # Queries are written with "%s"; the SQLite version ("?") is compiled once and cached
+    start = time.perf_counter() if METRICS_ENABLED else None
     cur = db.cursor()
+    cur.execute(compile_sql(query, DB_DIALECT)[0], params)
+    if start is not None:
+        record_query(query_label(query), start)
+    return cur
 
-    if isinstance(db, sqlite3.Connection):
-        # PostgreSQL uses "%s"
-        q = query.replace("%s", "?")
-        cur.execute(q, params)
-    else:
-        # SQLite uses "?"
-        cur.execute(query, params)
+def run_query(db, name, params=()):
+    # Named query from queries.py (prepared once per connection on PostgreSQL)
+    start = time.perf_counter() if METRICS_ENABLED else None
+    cur = run_named(db, name, params, DB_DIALECT, prepare=DB_PREPARE)
+    if start is not None:
+        record_query(name, start)
+    return cur
+
+def execute_many(db, query, params_seq):
+    # Same statement for many parameter sets, batched into few round trips
+    start = time.perf_counter() if METRICS_ENABLED else None
+    cur = run_batch(db, query, params_seq, DB_DIALECT)
+    if start is not None:
+        record_query(query_label(query), start)
     return cur
 
 def valid_username(username):
     return re.fullmatch(r"[A-Za-z0-9_]{3,20}", username) is not None
 
 def record_failed_attempt(username):
-    key = f"fails_{username}"
-    session[key] = session.get(key, 0) + 1
-    return session[key]
+    failure_limiter.hit(login_failures, "login_fails", username.lower())
+    return LOGIN_MAX_FAILURES - failure_limiter.get_window_stats(login_failures, "login_fails", username.lower()).remaining
 
 def reset_failed_attempts(username):
-    key = f"fails_{username}"
-    if key in session:
-        del session[key]
+    failure_limiter.clear(login_failures, "login_fails", username.lower())
+
+def login_retry_after(username):
+    # Seconds until the lockout ends, 0 if the user isn't locked out
+    if failure_limiter.test(login_failures, "login_fails", username.lower()):
+        return 0
+    reset_time = failure_limiter.get_window_stats(login_failures, "login_fails", username.lower()).reset_time
+    return max(1, int(reset_time - time.time()) + 1)
+
+def login_locked_response(retry_after):
+    # 429 instead of sleeping, so bots can't tie up workers
+    flash(f"Too many failed attempts. Try again in {retry_after} seconds.")
+    response = app.make_response((render_template("login.html"), 429))
+    response.headers["Retry-After"] = str(retry_after)
+    return response
+
+# Database connection pool (one per worker process)
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "1"))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "5"))
+DB_POOL_HEALTH_CHECK = float(os.getenv("DB_POOL_HEALTH_CHECK", "30"))
+
+_db_pool = None
+_db_pool_pid = None
+_db_pool_lock = threading.Lock()
+
+def get_db_pool():
+    global _db_pool, _db_pool_pid
+
+    # gunicorn forks workers, so every process needs its own pool
+    if _db_pool is not None and _db_pool_pid == os.getpid():
+        return _db_pool
+
+    with _db_pool_lock:
+        if _db_pool is None or _db_pool_pid != os.getpid():
+
+            # On Render -> use PostgreSQL
+            if DB_DIALECT == "postgres":
+                def connect():
+                    return psycopg2.connect(
+                        os.environ["DATABASE_URL"],
+                        connection_factory=PreparingConnection,
+                        cursor_factory=RealDictCursor
+                    )
+            else:
+                # Local development -> SQLite
+                connect = sqlite_connect(SQLITE_PATH)
+
+            _db_pool = ConnectionPool(
+                connect,
+                min_size=DB_POOL_MIN,
+                max_size=DB_POOL_MAX,
+                timeout=DB_POOL_TIMEOUT,
+                health_check_interval=DB_POOL_HEALTH_CHECK
+            )
+            _db_pool_pid = os.getpid()
+
+    return _db_pool
 
 def get_db():
     if "db" not in g:
-
-        # On Render -> use PostgreSQL
-        if "DATABASE_URL" in os.environ:
-            g.db = psycopg2.connect(
-                os.environ["DATABASE_URL"],
-                cursor_factory=RealDictCursor
-            )
-        else:
-            # Local development -> SQLite
-            g.db = sqlite3.connect("database/users.db", check_same_thread=False)
-            g.db.row_factory = sqlite3.Row
-            g.db.execute("PRAGMA foreign_keys = ON")
+        g.db = get_db_pool().getconn()
     return g.db
 
+@app.cli.command("migrate")
+def migrate_command():
+    """Apply pending database migrations."""
+    applied = migrate(get_db(), DB_DIALECT)
+    if not applied:
+        print("Database is up to date.")
+
+
+# Caches (see cache.py): one shared copy in Redis when REDIS_URL is set,
+# otherwise an in-process LRU per worker
+if redis_url:
+    import redis
+    redis_client = redis.Redis.from_url(redis_url, decode_responses=True)
+
+def make_cache(name, maxsize, ttl):
+    if redis_url:
+        return RedisCache(redis_client, prefix=f"cache:{name}", ttl=ttl)
+    return TTLCache(maxsize=maxsize, ttl=ttl)
+
+# Per-user settings cache, so rendering a page doesn't query user_settings every time.
+# Without Redis, a change only drops the copy of the worker that handled it and
+# the other workers keep theirs until it expires, so per-user data is only kept
+# for a few seconds there (same for user_cache below).
+SETTINGS_CACHE_TTL = int(os.getenv("SETTINGS_CACHE_TTL", "300" if redis_url else "5"))
+SETTINGS_CACHE_SIZE = int(os.getenv("SETTINGS_CACHE_SIZE", "10000"))
+
+settings_cache = make_cache("settings", SETTINGS_CACHE_SIZE, SETTINGS_CACHE_TTL)
+
+DEFAULT_SETTINGS = {
+    "theme": "german",
+    "sound_enabled": True,
+    "strict_articles": False,
+    "speedrun_enabled": False,
+    "custom_color": None,
+    "show_examples": True,
+    "plurals": False,
+    "force_umlauts": False
+}
+
+def load_user_settings(user_id):
+    row = run_query(get_db(), "user_settings", (user_id,)).fetchone()
+
+    # Cache "no row yet" as {} so those users don't hit the DB either
+    return dict(row) if row else {}
+
+def get_user_settings(user_id):
+    return settings_cache.get_or_set(user_id, partial(load_user_settings, user_id)) or None
+
+def invalidate_user_settings(user_id):
+    settings_cache.delete(user_id)
 
 def resolve_category_key(raw_cat):
     if not raw_cat:
         return None
 
-    # direct match
-    if raw_cat in CATEGORY_SIZES:
-        return raw_cat
+    # exact spelling first, then any case (see build_category_aliases)
+    return CATEGORY_ALIASES.get(raw_cat) or CATEGORY_ALIASES.get(raw_cat.lower())
 
-    # case-insensitive direct match
-    lower_raw = raw_cat.lower()
-    for k in CATEGORY_SIZES:
-        if k.lower() == lower_raw:
-            return k
+def process_stats(rows):
+    # Score rows -> what the profile templates show (canonical category + its size)
+    stats = []
+    for row in sorted(rows, key=lambda r: r["category"]):
+        raw_cat = row["category"]
+        resolved = resolve_category_key(raw_cat) or raw_cat
 
-    # suffix match: e.g., 'A1_colors' endswith '_colors'
-    for k in CATEGORY_SIZES:
-        if k.lower().endswith("_" + lower_raw):
-            return k
+        stats.append({
+            "raw": raw_cat,
+            "category": resolved,
+            "best_score": row["best_score"],
+            "best_time": row["best_time"],
+            "total_words": CATEGORY_SIZES.get(resolved, 0)
+        })
+    return stats
 
-    # try common prefix 'A1_'
-    candidate = f"A1_{raw_cat}"
-    for k in CATEGORY_SIZES:
-        if k.lower() == candidate.lower():
-            return k
+# Per-user data derived from the scores: profile pages (/account, /u/<username>,
+# loaded with one query) and /api/progress. Every entry is tagged "user:<id>",
+# so invalidate_user_cache() drops all of them when the user changes something.
+# The rank isn't cached, it is looked up in the ranking store on every view.
+USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", "60" if redis_url else "5"))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "5000"))
 
-    return None
+user_cache = make_cache("user", USER_CACHE_SIZE, USER_CACHE_TTL)
 
-def calculate_level(xp):
-    level = int((xp / 100) ** 0.7) + 1
-    return max(level, 1)
+def user_tags(user_id):
+    return (f"user:{user_id}",)
 
-def xp_for_next_level(level):
-    return int((level ** 1.4) * 120)
+def load_profile(query, key):
+    row = run_query(get_db(), query, (key,)).fetchone()
+    if not row:
+        return None
+
+    profile = dict(row)
+    stats = profile.pop("stats")
+    failed = profile.pop("failed")
+
+    # SQLite returns the JSON arrays as text
+    if isinstance(stats, str):
+        stats = json.loads(stats)
+    if isinstance(failed, str):
+        failed = json.loads(failed)
+
+    return {
+        "profile": profile,
+        "stats": process_stats(stats),
+        "failed": sorted(failed, key=lambda f: (-f["failures"], f["word"]))
+    }
+
+def get_profile(user_id=None, username=None):
+    if username is None:
+        return user_cache.get_or_set(
+            f"profile:{user_id}", partial(load_profile, "profile_by_id", user_id), tags=user_tags(user_id)
+        )
+
+    user_id = user_cache.get(f"name:{username}")
+    if user_id is not None:
+        data = get_profile(user_id=user_id)
+        if data is not None and data["profile"]["username"] == username:
+            return data
+
+    data = load_profile("profile_by_username", username)
+    if data is not None:
+        user_id = data["profile"]["id"]
+        user_cache.set(f"profile:{user_id}", data, tags=user_tags(user_id))
+        user_cache.set(f"name:{username}", user_id, tags=user_tags(user_id))
+    return data
+
+def invalidate_user_cache(user_id):
+    user_cache.invalidate_tag(f"user:{user_id}")
+
+# Materialized global ranking for /rankings (Redis when available)
+RANKINGS_PAGE_SIZE = 100
+
+if redis_url:
+    ranking_store = RedisRanking(redis_client)
+else:
+    # Seconds between catching up with other workers' changes
+    ranking_store = MemoryRanking(refresh_interval=int(os.getenv("RANKINGS_REFRESH", "60")))
+
+def load_ranking_rows():
+    return execute(get_db(), """
+        SELECT id, username, level, xp, streak, country, created_at
+        FROM users
+    """).fetchall()
 
+def load_ranking_changes(since):
+    # Users whose ranking changed since `since` (index on ranking_changed_at) and
+    # the ids of accounts deleted since then, for MemoryRanking to catch up with
+    # other workers
+    db = get_db()
+    users = execute(db, """
+        SELECT id, username, level, xp, streak, country, created_at
+        FROM users
+        WHERE ranking_changed_at >= %s
+    """, (since,)).fetchall()
+    deleted = execute(db, "SELECT user_id FROM deleted_users WHERE deleted_at >= %s", (since,)).fetchall()
+    return users, [row["user_id"] for row in deleted]
+
+def sync_user_ranking(db, user_id, user=None):
+    # Push a user's current level/xp/streak into the ranking after a change
+    try:
+        if user is None:
+            user = execute(db, """
+                SELECT id, username, level, xp, streak, country, created_at
+                FROM users
+                WHERE id = %s
+            """, (user_id,)).fetchone()
 
-def update_streak(user_id):
+        if user:
+            ranking_store.update(user)
+        else:
+            ranking_store.remove(user_id)
+    except Exception as e:
+        print("Ranking update error:", e)
+        ranking_store.invalidate()
+
+@app.cli.command("expire-streaks")
+def expire_streaks_command():
+    """Reset the streaks of users who didn't play yesterday or today."""
+    # Run once a day (cron / Render cron job) shortly after midnight:
+    #     flask --app app expire-streaks
     db = get_db()
+    yesterday = date.today() - timedelta(days=1)
 
-    user = execute(db,
-        "SELECT streak, last_active FROM users WHERE id = %s",
-        (user_id,)
-    ).fetchone()
+    users = execute(db, """
+        UPDATE users
+        SET streak = 0, ranking_changed_at = %s
+        WHERE streak > 0
+        AND (last_active IS NULL OR last_active < %s)
+        RETURNING id, username, level, xp, streak, country, created_at
+    """, (utcnow(), yesterday)).fetchall()
+    db.commit()
 
-    today = date.today()
+    for user in users:
+        sync_user_ranking(db, user["id"], user)
+        invalidate_user_cache(user["id"])
 
-    # If no last_active yet → first login/play ever
-    if not user["last_active"]:
-        execute(db,
-            "UPDATE users SET streak = 1, last_active = %s WHERE id = %s",
-            (today, user_id)
-        )
-        return
+    print(f"Expired {len(users)} streak(s).")
 
-    last = datetime.strptime(str(user["last_active"]), "%Y-%m-%d").date()
+def get_user_rank(user_id):
+    try:
+        ranking_store.ensure_loaded(load_ranking_rows, load_ranking_changes)
+        rank = ranking_store.rank(user_id)
+        if rank is not None:
+            return rank
+    except Exception as e:
+        print("Ranking store error:", e)
 
-    # If already played today do nothing
-    if last == today:
-        return
+    # Fallback: count in the database
+    return run_query(get_db(), "user_rank", (user_id,)).fetchone()["rank"]
 
-    # If played yesterday streak continues
-    if last == today - timedelta(days=1):
-        new_streak = user["streak"] + 1
-    else:
-        # Missed a day = streak resets
-        new_streak = 1
+def get_rankings_page(page):
+    offset = (page - 1) * RANKINGS_PAGE_SIZE
+
+    try:
+        ranking_store.ensure_loaded(load_ranking_rows, load_ranking_changes)
+        total = ranking_store.count()
+        if total:
+            return ranking_store.page(offset, RANKINGS_PAGE_SIZE), total
+    except Exception as e:
+        print("Ranking store error:", e)
+
+    # Fallback: sort in the database (ranking not built yet or store unavailable)
+    db = get_db()
+    users = execute(db, """
+        SELECT id, username, level, xp, streak, country, created_at
+        FROM users
+        ORDER BY level DESC, xp DESC, streak DESC, created_at ASC, id ASC
+        LIMIT %s OFFSET %s
+    """, (RANKINGS_PAGE_SIZE, offset)).fetchall()
+
+    total = execute(db, "SELECT COUNT(*) AS c FROM users").fetchone()["c"]
+
+    ranked = []
+    for i, u in enumerate(users):
+        ranked.append({
+            "rank": offset + i + 1,
+            "username": u["username"],
+            "level": u["level"],
+            "xp": u["xp"],
+            "streak": u["streak"],
+            "country": u["country"],
+        })
+    return ranked, total
+
+def calculate_level(xp):
+    level = int((xp / 100) ** 0.7) + 1
+    return max(level, 1)
+
+def xp_for_next_level(level):
+    return int((level ** 1.4) * 120)
 
-    execute(db,
-        "UPDATE users SET streak = %s, last_active = %s WHERE id = %s",
-        (new_streak, today, user_id)
-    )
 
 def iso_to_emoji(code):
     if not code:
@@ -179,6 +615,90 @@ def iso_to_emoji(code):
 
 app.jinja_env.filters["country_flag"] = iso_to_emoji
 
+# Fingerprinted, precompressed static files (see assets.py).
+# Without a build (local development) everything is served from /static as before.
+ASSET_DIR = os.path.join(app.static_folder, "dist")
+ASSET_MANIFEST = load_manifest(ASSET_DIR)
+ASSET_FILES = set(ASSET_MANIFEST.values())
+
+# Quiz JSON files main.js fetches by level/category
+DATA_ASSETS = {
+    name[len("data/"):]: "/assets/" + target
+    for name, target in ASSET_MANIFEST.items() if name.startswith("data/")
+}
+
+def asset_url_for(endpoint, **values):
+    # url_for for templates: static files that are in the manifest get their hashed URL
+    if endpoint == "static" and values.get("filename") in ASSET_MANIFEST:
+        values["filename"] = ASSET_MANIFEST[values["filename"]]
+        return url_for("asset_file", **values)
+    return url_for(endpoint, **values)
+
+app.jinja_env.globals["url_for"] = asset_url_for
+
+@app.cli.command("build-assets")
+def build_assets_command():
+    """Write hashed and precompressed static files to static/dist."""
+    build_assets(app.static_folder, ASSET_DIR)
+
+# Full-page cache for logged-out visitors on pages that only depend on the URL.
+# The CSRF token in the page belongs to the visitor's session, so it is stored
+# as a placeholder and filled in for every response.
+PAGE_CACHE_ENABLED = os.getenv("PAGE_CACHE_ENABLED", "1") == "1"
+PAGE_CACHE_TTL = int(os.getenv("PAGE_CACHE_TTL", "300"))
+CSRF_PLACEHOLDER = "__csrf_token__"
+
+# Pages from an older deploy point to assets that no longer exist
+PAGE_CACHE_VERSION = hashlib.sha256(
+    (os.getenv("RENDER_GIT_COMMIT", "") + json.dumps(ASSET_MANIFEST, sort_keys=True)).encode()
+).hexdigest()[:12]
+
+page_cache = make_cache("page", 256, PAGE_CACHE_TTL)
+
+def cached_page(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        # Logged-in users and pending flash messages change the page
+        if not PAGE_CACHE_ENABLED or "user_id" in session or "_flashes" in session:
+            return view(*args, **kwargs)
+
+        key = f"{PAGE_CACHE_VERSION}:{request.path}"
+
+        try:
+            entry = page_cache.get(key)
+        except Exception as e:
+            print("Page cache error:", e)
+            return view(*args, **kwargs)
+
+        if entry is None:
+            token = generate_csrf()
+            response = app.make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+
+            body = response.get_data(as_text=True).replace(token, CSRF_PLACEHOLDER)
+            entry = {"body": body, "etag": hashlib.sha256(body.encode("utf8")).hexdigest()[:20]}
+
+            try:
+                page_cache.set(key, entry)
+            except Exception as e:
+                print("Page cache error:", e)
+
+        # Weak ETag: the token differs, the page doesn't
+        if request.if_none_match.contains_weak(entry["etag"]):
+            response = app.response_class(status=304)
+        else:
+            response = app.response_class(
+                entry["body"].replace(CSRF_PLACEHOLDER, generate_csrf()), mimetype="text/html"
+            )
+
+        response.set_etag(entry["etag"], weak=True)
+        response.headers["Cache-Control"] = "private, no-cache"
+        response.vary.add("Cookie")
+        return response
+
+    return wrapper
+
 @app.route("/robots.txt")
 def robots_txt():
     return send_from_directory("static", "robots.txt", mimetype="text/plain")
@@ -188,22 +708,83 @@ def sitemap_xml():
     return send_from_directory("static", "sitemap.xml", mimetype="application/xml")
 
 @app.route("/")
+@cached_page
 def landing():
     return render_template("landing.html")
 
 @app.route("/contact")
+@cached_page
 def contact():
     return render_template("contact.html")
 
 @app.route("/privacy")
+@cached_page
 def privacy():
     return render_template("privacy.html")
 
 @app.route("/uploads/<filename>")
 def uploaded_file(filename):
-    return send_from_directory(UPLOAD_FOLDER, filename)
+    # Avatar filenames contain a uuid and are never overwritten, so every file
+    # can be cached forever and its name is a strong ETag.
+    # ?s=48|128|256 picks the WebP size if the browser accepts WebP.
+    size = request.args.get("s", type=int)
+    name = filename
+
+    if size in AVATAR_SIZES and request.accept_mimetypes["image/webp"]:
+        name = variant_name(filename, size)
+        if not os.path.isfile(safe_join(UPLOAD_FOLDER, name) or ""):
+            name = filename  # avatars from before the WebP sizes only have the PNG
+
+    path = safe_join(UPLOAD_FOLDER, name)
+    if path is None or not os.path.isfile(path):
+        return "Not found", 404
+
+    etag = name
+
+    if etag in request.if_none_match:
+        response = app.response_class(status=304)
+    elif AVATAR_ACCEL_PREFIX:
+        response = app.response_class(mimetype="image/webp" if name.endswith(".webp") else "image/png")
+        response.headers["X-Accel-Redirect"] = AVATAR_ACCEL_PREFIX.rstrip("/") + "/" + name
+    else:
+        # werkzeug's version, Flask's only reads USE_X_SENDFILE from the app config
+        response = send_upload(UPLOAD_FOLDER, name, request.environ, etag=False, use_x_sendfile=AVATAR_X_SENDFILE)
+
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    if size is not None:
+        response.headers["Vary"] = "Accept"
+    return response
+
+@app.route("/assets/<path:filename>")
+def asset_file(filename):
+    # Hashed names change with the content, so they can be cached forever
+    if filename not in ASSET_FILES:
+        return "Not found", 404
+
+    name = filename
+    encoding = None
+
+    # Send the .br / .gz built next to the file if the browser accepts it
+    for enc, ext in (("br", ".br"), ("gzip", ".gz")):
+        if request.accept_encodings[enc] and os.path.isfile(os.path.join(ASSET_DIR, filename + ext)):
+            name, encoding = filename + ext, enc
+            break
+
+    response = send_upload(
+        ASSET_DIR, name, request.environ,
+        mimetype=mimetypes.guess_type(filename)[0], etag=name
+    )
+
+    # Flask-Compress leaves responses that already have a Content-Encoding alone
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    response.vary.add("Accept-Encoding")
+    return response
 
 @app.route("/future_features")
+@cached_page
 def future_features():
     return render_template("future_features.html")
 
@@ -211,17 +792,53 @@ def future_features():
 def close_db(exception):
     db = g.pop("db", None)
     if db is not None:
-        db.close()
+        # Hand the connection back to the pool (rolled back if not committed)
+        get_db_pool().putconn(db)
+
+@app.route("/healthz")
+def healthz():
+    return jsonify({"status": "ok", "db_pool": get_db_pool().stats()})
+
+@app.route("/metrics")
+def metrics_endpoint():
+    if not METRICS_ENABLED:
+        return "Not found", 404
+
+    # Query labels contain SQL, so without a token only the machine itself gets them
+    if not METRICS_TOKEN:
+        if request.remote_addr not in LOOPBACK_ADDRESSES:
+            return "Not found", 404
+    elif not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {METRICS_TOKEN}"):
+        return "Unauthorized", 401
+
+    pool = get_db_pool().stats()
+    gauges = {
+        "db_pool_connections": ("Connections in this worker's pool.", {
+            f'state="{state}"': pool[state] for state in ("size", "idle", "in_use")
+        }),
+        "db_pool_events": ("Pool events since start (created, discarded, checkouts, timeouts).", {
+            f'event="{event}"': value for event, value in pool.items()
+            if event not in ("size", "idle", "in_use", "min_size", "max_size")
+        }),
+        "cache_hits": ("In-process cache hits.", {
+            'cache="settings"': settings_cache.hits, 'cache="leaderboard"': leaderboard_cache.hits,
+            'cache="user"': user_cache.hits, 'cache="page"': page_cache.hits
+        }),
+        "cache_misses": ("In-process cache misses.", {
+            'cache="settings"': settings_cache.misses, 'cache="leaderboard"': leaderboard_cache.misses,
+            'cache="user"': user_cache.misses, 'cache="page"': page_cache.misses
+        }),
+    }
+
+    return app.response_class(metrics.render(gauges), mimetype="text/plain; version=0.0.4")
 
 @app.route("/a1")
+@cached_page
 def index():
     db = get_db()
 
     if "user_id" in session:
-        failed = execute(db, """
-            SELECT COUNT(*) AS c FROM failed_words
-            WHERE user_id = %s
-        """, (session["user_id"],)).fetchone()
+        failed = run_query(db, "failed_words_count", (utcnow(), session["user_id"])).fetchone()
         
         failed_count = failed["c"] if failed else 0
     else:
@@ -233,51 +850,72 @@ def index():
 def page_not_found(e):
     return render_template("404.html"), 404
 
+@app.errorhandler(429)
+def too_many_requests(e):
+    # Tell clients when to retry instead of holding the request open
+    response = e.get_response()
+    limit = limiter.current_limit
+    if limit:
+        response.headers["Retry-After"] = str(max(1, int(limit.reset_at - time.time()) + 1))
+    return response
+
 @app.route("/a1/basics")
+@cached_page
 def a1_basics():
     return render_template("a1_basics.html", category="basics")
 
 @app.route("/a1/grammar_basics")
+@cached_page
 def a1_grammar_basics():
     return render_template("a1_grammar_basics.html", category="grammar_basics")
 
 @app.route("/a1/people_daily_life")
+@cached_page
 def a1_people_daily_life():
     return render_template("a1_people_daily_life.html", category="people_daily_life")
 
 @app.route("/a1/objects_things")
+@cached_page
 def a1_objects_things():
     return render_template("a1_objects_things.html", category="objects_things")
 
 @app.route("/a1/environment")
+@cached_page
 def a1_environment():
     return render_template("a1_environment.html", category="environment")
 
 @app.route("/a1/verbs")
+@cached_page
 def a1_verbs():
     return render_template("a1_verbs.html", category="verbs")
 
 @app.route("/a1/adjectives")
+@cached_page
 def a1_adjectives():
     return render_template("a1_adjectives.html", category="adjectives")
 
 @app.route("/a1/marathon")
+@cached_page
 def marathon():
     return render_template("a1_marathon.html")
 
 @app.route("/api/progress")
+@api_rate_limit
 def api_progress():
     if "user_id" not in session:
         return jsonify({})
 
-    db = get_db()
+    user_id = session["user_id"]
+    return jsonify(user_cache.get_or_set(
+        f"progress:{user_id}", partial(load_progress, user_id), tags=user_tags(user_id)
+    ))
 
-    rows = execute(db, """
-        SELECT category, best_score
-        FROM scores
-        WHERE user_id = %s
-    """, (session["user_id"],)).fetchall()
+def load_progress(user_id):
+    rows = run_query(get_db(), "progress_scores", (user_id,)).fetchall()
+    return progress_percentages(rows)
 
+def progress_percentages(rows):
+    # Shared with the async API (asgi.py)
     result = {}
 
     for row in rows:
@@ -299,7 +937,7 @@ def api_progress():
         # Use canonical lowercase key → a1_colors, a1_marathon
         result[key.lower()] = percent
 
-    return jsonify(result)
+    return result
 
 
 @app.route("/register", methods=["GET", "POST"])
@@ -345,12 +983,13 @@ def register():
 
         # Insert user
         execute(db,
-            "INSERT INTO users (username, hash) VALUES (%s, %s)",
-            (username, hash_pw)
+            "INSERT INTO users (username, hash, ranking_changed_at) VALUES (%s, %s, %s)",
+            (username, hash_pw, utcnow())
         )
         db.commit()
 
-        time.sleep(1)  # anti-bot delay
+        new_user = execute(db, "SELECT id FROM users WHERE username = %s", (username,)).fetchone()
+        sync_user_ranking(db, new_user["id"])
 
         flash("Registration successful! Please log in.")
         return redirect("/login")
@@ -371,11 +1010,9 @@ def login():
         db = get_db()
 
         # Temporary lockout for repeated failures
-        fails = session.get(f"fails_{username}", 0)
-        if fails >= 5:
-            flash("Too many failed attempts. Try again in 1 minute.")
-            time.sleep(2)  # slow down bots
-            return redirect("/login")
+        retry_after = login_retry_after(username)
+        if retry_after:
+            return login_locked_response(retry_after)
 
         # Fetch user
         user = execute(db,
@@ -386,17 +1023,13 @@ def login():
         # Validate user + password
         if not user or not check_password_hash(user["hash"], password):
 
-            # delay to slow brute force
-            time.sleep(1)
-
             attempts = record_failed_attempt(username)
-            remaining = max(0, 5 - attempts)
+            remaining = max(0, LOGIN_MAX_FAILURES - attempts)
 
             if remaining == 0:
-                flash("Too many failed attempts. Locked for 1 minute.")
-            else:
-                flash(f"Invalid credentials ({remaining} attempts left).")
+                return login_locked_response(login_retry_after(username))
 
+            flash(f"Invalid credentials ({remaining} attempts left).")
             return redirect("/login")
 
         # Successful login → reset failure counter
@@ -418,6 +1051,7 @@ def logout():
 
     
 @app.route("/save_score", methods=["POST"])
+@api_rate_limit
 def save_score():
     if "user_id" not in session:
         return jsonify({"status": "error", "message": "not_logged_in"})
@@ -437,38 +1071,42 @@ def save_score():
     if category == "failed_words":
         return jsonify({"status": "ignored"})
 
+    # The score is what the server counts from the submitted answers
+    score = verified_score(resolve_category_key(category) or category, data)
+    if score is None:
+        return jsonify({"error": "missing_data"}), 400
+
     db = get_db()
+    user_id = session["user_id"]
 
-    update_streak(session["user_id"])
+    # 1. Best score: only written when it beats the stored one (RETURNING tells us)
+    record = run_query(db, "save_best_score", (user_id, category, score, time)).fetchone()
 
-    existing = execute(db,
-        "SELECT * FROM scores WHERE user_id = %s AND category = %s",
-        (session["user_id"], category)
-    ).fetchone()
+    earned_new_record = record is not None
 
-    earned_new_record = False
+    # XP system
+    xp_gain = score_xp(category, score, time) if earned_new_record else 0
 
-    if existing:
-        if score > existing["best_score"] or (score == existing["best_score"] and time < existing["best_time"]):
-            earned_new_record = True
-            execute(db, """
-                UPDATE scores
-                SET best_score = %s, best_time = %s
-                WHERE id = %s
-            """, (score, time, existing["id"]))
-    else:
-        earned_new_record = True
-        execute(db, """
-            INSERT INTO scores (user_id, category, best_score, best_time)
-            VALUES (%s, %s, %s, %s)
-        """, (session["user_id"], category, score, time))
+    # 2. Streak + XP + level-ups in a single UPDATE (see queries.py)
+    today = date.today()
+    user = run_query(db, "award_xp", {
+        "today": today,
+        "yesterday": today - timedelta(days=1),
+        "xp_gain": xp_gain,
+        "now": utcnow(),
+        "user_id": user_id
+    }).fetchone()
+
+    db.commit()
+    invalidate_user_cache(user_id)
+    sync_user_ranking(db, user_id, user)
 
     if not earned_new_record:
-        db.commit()
         return jsonify({"status": "no_xp"})
 
-    # XP system
+    return jsonify({"status": "ok"})
 
+def score_xp(category, score, time):
     # category size from preloaded dictionary
     # resolve category to canonical key (e.g., 'colors' -> 'A1_colors')
     resolved_key = resolve_category_key(category) or category
@@ -482,92 +1120,128 @@ def save_score():
     elif time < 70:
         speed_bonus = 10
 
-    xp_gain = percent + speed_bonus
+    return percent + speed_bonus
 
-    # fetch current XP/Level
-    user = execute(db,
-        "SELECT xp, level, next_level_xp, streak FROM users WHERE id = %s",
-        (session["user_id"],)
-    ).fetchone()
 
-    current_xp = user["xp"]
-    level = user["level"]
-    next_req = user["next_level_xp"]
-    streak = user["streak"]
+MAX_FAILURE_BATCH = 500
+FAILURE_CHUNK_SIZE = 100
 
-    # GIVE XP
-    current_xp += xp_gain
+def merge_failures(items):
+    # Merge repeated words first: ON CONFLICT can't touch the same row twice
+    merged = {}
+    for item in items:
+        word = item.get("word")
+        if not word or not item.get("category"):
+            continue
 
-    # HANDLE LEVEL UPS
-    while current_xp >= next_req:
-        current_xp -= next_req
-        level += 1
-        next_req = int(next_req * 1.25)  # increasing curve
+        # Latest metadata wins, failures add up
+        count = merged[word]["failures"] + 1 if word in merged else 1
+        merged[word] = dict(item, failures=count)
+
+    return list(merged.values())
+
+def failure_upserts(user_id, rows):
+    # One multi-row upsert per chunk: yields (query, params)
+    now = utcnow()
+
+    for start in range(0, len(rows), FAILURE_CHUNK_SIZE):
+        chunk = rows[start:start + FAILURE_CHUNK_SIZE]
+
+        params = []
+        for row in chunk:
+            params.extend((
+                user_id,
+                row["category"],
+                row["word"],
+                row.get("english"),
+                row.get("gender"),
+                row.get("plural"),
+                row["failures"],
+                now
+            ))
+
+        # Increment failure count + overwrite metadata in case it's new/updated.
+        # A new failure also restarts the word's review schedule (due right away).
+        values = ", ".join(["(%s, %s, %s, %s, %s, %s, %s, %s)"] * len(chunk))
+        yield f"""
+            INSERT INTO failed_words (user_id, category, word, english, gender, plural, failures, due_at)
+            VALUES {values}
+            ON CONFLICT (user_id, word)
+            DO UPDATE SET
+                failures = failed_words.failures + EXCLUDED.failures,
+                english = EXCLUDED.english,
+                gender = EXCLUDED.gender,
+                plural = EXCLUDED.plural,
+                category = EXCLUDED.category,
+                repetitions = 0,
+                interval_days = 0,
+                due_at = EXCLUDED.due_at
+        """, params
 
-    # update user XP and level
-    execute(db, """
-        UPDATE users
-        SET xp = %s, level = %s, next_level_xp = %s
-        WHERE id = %s
-    """, (current_xp, level, next_req, session["user_id"]))
+def record_failures(db, user_id, items):
+    rows = merge_failures(items)
 
-    db.commit()
-    return jsonify({"status": "ok"})
+    for query, params in failure_upserts(user_id, rows):
+        execute(db, query, params)
 
+    return len(rows)
 
 @app.route("/save_failure", methods=["POST"])
+@api_rate_limit
 def save_failure():
     if "user_id" not in session:
         return jsonify({"status": "error", "message": "not_logged_in"})
 
     data = request.get_json()
 
-    category = data["category"]
-    word = data["word"]               # German word
-    english = data.get("english")     # English meaning
-    gender = data.get("gender")       # m/f/n or None
-    plural = data.get("plural")       # plural form or None
-
     db = get_db()
+    record_failures(db, session["user_id"], [{
+        "category": data["category"],
+        "word": data["word"],               # German word
+        "english": data.get("english"),     # English meaning
+        "gender": data.get("gender"),       # m/f/n or None
+        "plural": data.get("plural")        # plural form or None
+    }])
+    db.commit()
+    invalidate_user_cache(session["user_id"])
 
-    existing = execute(db,
-        "SELECT * FROM failed_words WHERE user_id = %s AND word = %s",
-        (session["user_id"], word)
-    ).fetchone()
+    return jsonify({"status": "ok"})
 
-    if existing:
-        # Update failure count + overwrite metadata in case it's new/updated
-        execute(db, """
-            UPDATE failed_words
-            SET failures = failures + 1,
-                english = %s,
-                gender = %s,
-                plural = %s,
-                category = %s
-            WHERE id = %s
-        """, (english, gender, plural, category, existing["id"]))
-    else:
-        # Insert new entry
-        execute(db, """
-            INSERT INTO failed_words (user_id, category, word, english, gender, plural, failures)
-            VALUES (%s, %s, %s, %s, %s, %s, %s)
-        """, (session["user_id"], category, word, english, gender, plural, 1))
+@app.route("/save_failures", methods=["POST"])
+@api_rate_limit
+def save_failures():
+    if "user_id" not in session:
+        return jsonify({"status": "error", "message": "not_logged_in"})
+
+    data = request.get_json(silent=True) or {}
+    failures = data.get("failures")
+
+    if not isinstance(failures, list) or len(failures) > MAX_FAILURE_BATCH:
+        return jsonify({"error": "invalid_data"}), 400
 
+    items = [f for f in failures if isinstance(f, dict)]
+
+    db = get_db()
+    saved = record_failures(db, session["user_id"], items)
     db.commit()
-    return jsonify({"status": "ok"})
+    invalidate_user_cache(session["user_id"])
+
+    return jsonify({"status": "ok", "saved": saved})
+
+REVIEW_SIZE = 20
+MAX_REVIEW_SIZE = 100
 
 @app.route("/api/failed_words")
 def get_failed_words():
     if "user_id" not in session:
         return jsonify([])
 
+    # Only the words that are due for review (see srs.py)
+    limit = request.args.get("limit", REVIEW_SIZE, type=int)
+    limit = min(max(limit, 1), MAX_REVIEW_SIZE)
+
     db = get_db()
-    rows = execute(db, """
-        SELECT word, english, gender, plural, category, failures
-        FROM failed_words
-        WHERE user_id = %s
-        ORDER BY failures DESC
-    """, (session["user_id"],)).fetchall()
+    rows = run_query(db, "due_failed_words", (session["user_id"], utcnow(), limit)).fetchall()
 
     words = []
     for row in rows:
@@ -580,6 +1254,51 @@ def get_failed_words():
 
     return jsonify(words)
 
+@app.route("/save_reviews", methods=["POST"])
+def save_reviews():
+    if "user_id" not in session:
+        return jsonify({"status": "error", "message": "not_logged_in"})
+
+    data = request.get_json(silent=True) or {}
+    reviews = data.get("reviews")
+
+    if not isinstance(reviews, list) or len(reviews) > MAX_FAILURE_BATCH:
+        return jsonify({"error": "invalid_data"}), 400
+
+    # Last answer per word counts
+    answers = {}
+    for review in reviews:
+        if isinstance(review, dict) and review.get("word"):
+            answers[review["word"]] = bool(review.get("correct"))
+
+    if not answers:
+        return jsonify({"status": "ok", "saved": 0})
+
+    db = get_db()
+    placeholders = ", ".join(["%s"] * len(answers))
+    rows = execute(db, f"""
+        SELECT word, ease, interval_days, repetitions
+        FROM failed_words
+        WHERE user_id = %s
+        AND word IN ({placeholders})
+    """, (session["user_id"], *answers)).fetchall()
+
+    updates = []
+    for row in rows:
+        ease, interval_days, repetitions, due_at = schedule(
+            row["ease"] or DEFAULT_EASE, row["interval_days"], row["repetitions"], answers[row["word"]]
+        )
+        updates.append((ease, interval_days, repetitions, due_at, session["user_id"], row["word"]))
+
+    execute_many(db, """
+        UPDATE failed_words
+        SET ease = %s, interval_days = %s, repetitions = %s, due_at = %s
+        WHERE user_id = %s AND word = %s
+    """, updates)
+    db.commit()
+
+    return jsonify({"status": "ok", "saved": len(updates)})
+
 @app.route("/clear_failed_words", methods=["POST"])
 def clear_failed_words():
     if "user_id" not in session:
@@ -588,6 +1307,7 @@ def clear_failed_words():
     db = get_db()
     execute(db, "DELETE FROM failed_words WHERE user_id = %s", (session["user_id"],))
     db.commit()
+    invalidate_user_cache(session["user_id"])
 
     flash("Failed words cleared!")
     return redirect("/account")
@@ -600,6 +1320,7 @@ def clear_best_scores():
     db = get_db()
     execute(db, "DELETE FROM scores WHERE user_id = %s", (session["user_id"],))
     db.commit()
+    invalidate_user_cache(session["user_id"])
 
     flash("Best Scores cleared!")
     return redirect("/account")
@@ -629,10 +1350,17 @@ def change_username():
 
     # Update username
     execute(db,
-        "UPDATE users SET username = %s WHERE id = %s",
+        "UPDATE users SET username = %s, ranking_changed_at = %s WHERE id = %s",
+        (new_username, utcnow(), session["user_id"])
+    )
+    execute(db,
+        "UPDATE leaderboard_best SET username = %s WHERE user_id = %s",
         (new_username, session["user_id"])
     )
     db.commit()
+    invalidate_user_cache(session["user_id"])
+    sync_user_ranking(db, session["user_id"])
+    leaderboard_cache.invalidate_tag(leaderboard_tag(session["username"]))
 
     # Update session
     session["username"] = new_username
@@ -658,6 +1386,7 @@ def change_bio():
         (new_bio, session["user_id"])
     )
     db.commit()
+    invalidate_user_cache(session["user_id"])
 
     flash("Bio updated!")
     return redirect("/account")
@@ -670,25 +1399,27 @@ def delete_account():
     user_id = session["user_id"]
     db = get_db()
 
-    # 1. Remove avatar file if exists
+    # 1. Remove avatar files if they exist
     user = execute(db, "SELECT avatar FROM users WHERE id = %s", (user_id,)).fetchone()
     if user and user["avatar"]:
-        avatar_path = os.path.join(UPLOAD_FOLDER, user["avatar"])
-        if os.path.exists(avatar_path):
-            try:
-                os.remove(avatar_path)
-            except:
-                pass  # safe fallback
+        remove_avatar_files(user["avatar"])
 
     # 2. Delete related database entries
     execute(db, "DELETE FROM failed_words WHERE user_id = %s", (user_id,))
     execute(db, "DELETE FROM scores WHERE user_id = %s", (user_id,))
     execute(db, "DELETE FROM leaderboard WHERE user_id = %s", (user_id,))
+    execute(db, "DELETE FROM leaderboard_best WHERE user_id = %s", (user_id,))
 
-    # 3. Delete user
+    # 3. Delete user (the tombstone tells other workers' rankings to drop them)
     execute(db, "DELETE FROM users WHERE id = %s", (user_id,))
+    execute(db, "INSERT INTO deleted_users (user_id, deleted_at) VALUES (%s, %s)", (user_id, utcnow()))
     db.commit()
 
+    invalidate_user_settings(user_id)
+    invalidate_user_cache(user_id)
+    sync_user_ranking(db, user_id)
+    leaderboard_cache.invalidate_tag(leaderboard_tag(session["username"]))
+
     # 4. Log out
     session.clear()
 
@@ -710,9 +1441,11 @@ def update_country():
         country = None
 
     db = get_db()
-    execute(db, "UPDATE users SET country=%s WHERE id=%s",
-            (country, session["user_id"]))
+    execute(db, "UPDATE users SET country=%s, ranking_changed_at=%s WHERE id=%s",
+            (country, utcnow(), session["user_id"]))
     db.commit()
+    invalidate_user_cache(session["user_id"])
+    sync_user_ranking(db, session["user_id"])
 
     flash("Country updated!")
     return redirect("/account")
@@ -722,50 +1455,16 @@ def account():
     if "user_id" not in session:
         return redirect(url_for("login"))
 
-    db = get_db()
-
-    # Load user data
-    user = execute(db,
-        "SELECT id, username, avatar, xp, level, next_level_xp, streak, bio FROM users WHERE id = %s",
-        (session["user_id"],)
-    ).fetchone()
-
-    # Fetch all stats for this user
-    raw_stats = execute(db, """
-        SELECT category, best_score, best_time
-        FROM scores
-        WHERE user_id = %s
-        AND category != 'failed_words'
-        ORDER BY category
-    """, (session["user_id"],)).fetchall()
-
-    processed_stats = []
-    for row in raw_stats:
-        raw_cat = row["category"]
-        resolved = resolve_category_key(raw_cat) or raw_cat
-
-        total_words = CATEGORY_SIZES.get(resolved, 0)
-
-        processed_stats.append({
-            "raw": raw_cat,
-            "category": resolved,
-            "best_score": row["best_score"],
-            "best_time": row["best_time"],
-            "total_words": total_words
-        })
-
-    # Fetch the user's failed words
-    failed = execute(db, """
-        SELECT word, failures, category
-        FROM failed_words
-        WHERE user_id = %s
-        ORDER BY failures DESC, word ASC
-    """, (session["user_id"],)).fetchall()
+    # User data, stats and failed words (one query, cached)
+    data = get_profile(user_id=session["user_id"])
+    if data is None:
+        session.clear()
+        return redirect(url_for("login"))
 
     return render_template("account.html",
-                           profile=user,
-                           stats=processed_stats,
-                           failed=failed,
+                           profile=data["profile"],
+                           stats=data["stats"],
+                           failed=data["failed"],
                            category_sizes=CATEGORY_SIZES)
 
 @app.route("/settings", methods=["GET", "POST"])
@@ -805,13 +1504,11 @@ def settings():
         """, (session["user_id"], theme, sound, custom_color, speedrun, strict, show_examples, plurals, force_umlauts))
 
         db.commit()
+        invalidate_user_settings(session["user_id"])
         flash("Settings updated!")
         return redirect("/settings")
 
-    settings_data = execute(db,
-        "SELECT * FROM user_settings WHERE user_id = %s",
-        (session["user_id"],)
-    ).fetchone()
+    settings_data = get_user_settings(session["user_id"])
 
     if not settings_data:
         execute(db, """
@@ -821,12 +1518,10 @@ def settings():
             ) VALUES (%s, 'german', TRUE, NULL, FALSE, FALSE, TRUE, FALSE, FALSE)
         """, (session["user_id"],))
         db.commit()
+        invalidate_user_settings(session["user_id"])
 
         # Re-fetch to get the row as dict
-        settings_data = execute(db,
-            "SELECT * FROM user_settings WHERE user_id = %s",
-            (session["user_id"],)
-        ).fetchone()
+        settings_data = get_user_settings(session["user_id"])
 
     return render_template("settings.html", settings=settings_data)
 
@@ -834,281 +1529,352 @@ def settings():
 def api_settings():
     if "user_id" not in session:
         return jsonify({})
-    db = get_db()
-    s = execute(db,
-        "SELECT * FROM user_settings WHERE user_id = %s",
-        (session["user_id"],)
-    ).fetchone()
-    return jsonify(dict(s) if s else {})
+    s = get_user_settings(session["user_id"])
+    return jsonify(s or {})
+
+@app.context_processor
+def inject_assets():
+    return {"data_assets": DATA_ASSETS}
 
 @app.context_processor
 def inject_settings():
     if "user_id" not in session:
         # DEFAULTS when logged out
-        return {"settings": {
-            "theme": "german",
-            "sound_enabled": True,
-            "strict_articles": False,
-            "speedrun_enabled": False,
-            "custom_color": None,
-            "show_examples": True,
-            "plurals": False,
-            "force_umlauts": False
-        }}
+        return {"settings": DEFAULT_SETTINGS}
 
-    db = get_db()
-    s = execute(db,
-        "SELECT * FROM user_settings WHERE user_id = %s",
-        (session["user_id"],)
-    ).fetchone()
+    s = get_user_settings(session["user_id"])
 
     # If user exists but has no settings row yet → return defaults
     if not s:
-        return {"settings": {
-            "theme": "german",
-            "sound_enabled": True,
-            "strict_articles": False,
-            "speedrun_enabled": False,
-            "custom_color": None,
-            "show_examples": True,
-            "plurals": False,
-            "force_umlauts": False
-        }}
+        return {"settings": DEFAULT_SETTINGS}
 
     return {"settings": s}
 
+# Per-category top 10 cache for /api/leaderboard/<category>
+LEADERBOARD_SIZE = 10
+# Like the other caches, short without Redis: a new best time is only dropped
+# from the cache of the worker that saved it
+LEADERBOARD_CACHE_TTL = int(os.getenv("LEADERBOARD_CACHE_TTL", "60" if redis_url else "5"))
+
+leaderboard_cache = make_cache("leaderboard", 512, LEADERBOARD_CACHE_TTL)
+
+def leaderboard_tag(username):
+    return f"name:{username}"
+
+def leaderboard_tags(top):
+    # A cached top 10 is tagged with the usernames in it, so a rename or a
+    # deleted account only drops the categories that user is listed in
+    return [leaderboard_tag(row["username"]) for row in top]
+
+def is_number(value):
+    # bool is an int in Python, and json.loads accepts NaN and Infinity
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
 @app.route("/save_leaderboard", methods=["POST"])
 def save_leaderboard():
     if "user_id" not in session:
         return jsonify({"status": "error", "message": "not_logged_in"})
 
-    data = request.get_json()
-    category = data["category"]
-    score = data["score"]
-    time = data["time"]
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "invalid_data"}), 400
+
+    category = data.get("category")
+    score = data.get("score")
+    time = data.get("time")
+
+    # The time is compared against the cached top 10, so it has to be a real number
+    if not isinstance(category, str) or not is_number(score) or not is_number(time) or time < 0:
+        return jsonify({"error": "invalid_data"}), 400
+
     resolved_key = resolve_category_key(category) or category
     total = CATEGORY_SIZES.get(resolved_key, 0)
 
-    if score != total:
+    # Perfect runs only, and every answer has to check out on the server too
+    if not total or score != total or verified_score(resolved_key, data) != total:
         return jsonify({"status": "ignored"})
 
     db = get_db()
 
-    execute(db, """
-        INSERT INTO leaderboard (user_id, username, category, score, time)
-        VALUES (%s, %s, %s, %s, %s)
-    """, (session["user_id"], session["username"], resolved_key, score, time))
+    # Keep only each user's best perfect run per category
+    cur = run_query(db, "save_leaderboard_best",
+        (session["user_id"], session["username"], resolved_key, score, time))
 
     db.commit()
+
+    # Only drop the cached top 10 if this time actually made it in
+    if cur.rowcount:
+        top = leaderboard_cache.get(resolved_key)
+        if top is not None and (len(top) < LEADERBOARD_SIZE or time <= top[-1]["time"]):
+            leaderboard_cache.delete(resolved_key)
+
     return jsonify({"status": "ok"})
 
 @app.route("/api/leaderboard/<category>")
+@api_rate_limit
 def api_leaderboard(category):
-    db = get_db()
-
     resolved_key = resolve_category_key(category) or category
     total = CATEGORY_SIZES.get(resolved_key, 0)
 
-    rows = execute(db, """
-        SELECT username, MIN(time) AS time
-        FROM leaderboard
-        WHERE category = %s
-        AND score = %s
-        GROUP BY username
-        ORDER BY time ASC
-        LIMIT 10;
-    """, (resolved_key, total)).fetchall()
-
-    return jsonify([dict(r) for r in rows])
+    return jsonify(leaderboard_cache.get_or_set(
+        resolved_key, partial(load_leaderboard, resolved_key, total), tags=leaderboard_tags
+    ))
+
+def load_leaderboard(category_key, total):
+    rows = run_query(get_db(), "leaderboard_top", (category_key, total, LEADERBOARD_SIZE)).fetchall()
+    return [dict(r) for r in rows]
+
+def build_category_aliases(sizes):
+    # Every accepted spelling -> canonical key, in the order categories used
+    # to be matched: exact key, any case, then the part after an underscore
+    # ('colors' / 'A1_COLORS' -> 'A1_colors', 'marathon' -> 'a1_marathon').
+    # The name after the level comes before other endings, so 'pronouns' is
+    # A1_pronouns and not A1_possesive_pronouns.
+    aliases = {}
+
+    for key in sizes:
+        aliases[key] = key
+
+    for key in sizes:
+        aliases.setdefault(key.lower(), key)
+
+    for key in sizes:
+        aliases.setdefault(key.lower().partition("_")[2], key)
+
+    for key in sizes:
+        lower = key.lower()
+        for i, ch in enumerate(lower):
+            if ch == "_" and i + 1 < len(lower):
+                aliases.setdefault(lower[i + 1:], key)
+
+    return aliases
+
+vocab_store = VocabStore("static/data")
+answer_index = AnswerIndex()
+CATEGORY_SIZES = {}
+CATEGORY_ALIASES = {}
+
+def reload_vocab():
+    # (Re)load everything derived from static/data
+    vocab_store.load()
+    answer_index.load(vocab_store.entries)
+
+    sizes = vocab_store.category_sizes()
+    sizes["a1_marathon"] = 200
+
+    CATEGORY_SIZES.clear()
+    CATEGORY_SIZES.update(sizes)
+
+    CATEGORY_ALIASES.clear()
+    CATEGORY_ALIASES.update(build_category_aliases(sizes))
+
+reload_vocab()
+
+# Categories the marathon draws its words from
+MARATHON_SIZE = 200
+MARATHON_CATEGORIES = {
+    "A1": [
+        "colors", "numbers", "countries_languages", "directions",
+        "basic_phrases", "communication",
+        "w_questions", "prepositions", "pronouns", "conversation_particles",
+        "negation", "time_expressions", "possesive_pronouns", "quantifiers",
+        "family", "clothing", "home_furniture", "people_descriptions", "school", "work_jobs",
+        "transport", "hobbies_free_time", "media_technology",
+        "food_drinks", "household_items", "everyday_objects", "toys",
+        "weather", "animals", "nature", "geography_basics", "city_places",
+        "common_verbs", "daily_activities", "modal_verbs", "transport_verbs",
+        "common_adjectives", "feelings", "sizes_measurements"
+    ]
+}
+
+@app.route("/api/marathon")
+def api_marathon():
+    level = request.args.get("level", "A1")
+    n = request.args.get("n", MARATHON_SIZE, type=int)
+    seed = request.args.get("seed")
+
+    if level not in vocab_store.by_level:
+        return jsonify({"error": "unknown_level"}), 404
+
+    n = max(1, min(n, 500))
+    words = vocab_store.sample(level, n, seed=seed, categories=MARATHON_CATEGORIES.get(level))
+
+    response = jsonify([entry_to_dict(w, with_category=True) for w in words])
+
+    # A seeded sample is always the same, so it can be cached
+    if seed is not None:
+        response.headers["Cache-Control"] = "public, max-age=3600"
+    else:
+        response.headers["Cache-Control"] = "no-store"
+    return response
 
-def load_category_sizes():
-    base_path = "static/data"
-    sizes = {}
+# Checking a whole quiz's answers (answers.py)
+MAX_QUIZ_ANSWERS = 500
 
-    for level in os.listdir(base_path):
-        level_path = os.path.join(base_path, level)
+def quiz_categories(category_key):
+    # (level, category) pairs a quiz's words are drawn from
+    if category_key == "a1_marathon":
+        return {("A1", cat) for cat in MARATHON_CATEGORIES["A1"]}
 
-        if not os.path.isdir(level_path):
-            continue
+    level, _, cat = category_key.partition("_")
+    return {(level, cat)}
 
-        for file in os.listdir(level_path):
-            if file.endswith(".json"):
-                category_name = f"{level}_{file[:-5]}"
-                full_path = os.path.join(level_path, file)
+def verified_score(category_key, data):
+    # Entries answered correctly according to the server, None if no answers were sent
+    answers = data.get("answers")
+    if answers is None:
+        return None
 
-                with open(full_path, "r", encoding="utf8") as f:
-                    data = json.load(f)
-                    sizes[category_name] = len(data)
+    if not isinstance(answers, list) or len(answers) > MAX_QUIZ_ANSWERS:
+        return 0
 
-    return sizes
+    return answer_index.score(answers, data.get("mode"), quiz_categories(category_key))
 
-CATEGORY_SIZES = load_category_sizes()
-CATEGORY_SIZES["a1_marathon"] = 200
+@app.route("/api/check_answers", methods=["POST"])
+def api_check_answers():
+    data = request.get_json(silent=True)
+    answers = data.get("answers") if isinstance(data, dict) else None
 
-@app.route("/api/a1_files")
-def api_a1_files():
-    base = "static/data/A1"
-    files = []
+    if not isinstance(answers, list) or len(answers) > MAX_QUIZ_ANSWERS:
+        return jsonify({"error": "invalid_data"}), 400
 
-    for file in os.listdir(base):
-        if file.endswith(".json"):
-            files.append(file[:-5])
+    # The user's quiz settings unless the request overrides them
+    s = get_user_settings(session["user_id"]) if "user_id" in session else None
+    s = s or DEFAULT_SETTINGS
 
-    return jsonify(files)
+    settings = {
+        "strict": bool(data.get("strict", s["strict_articles"])),
+        "plurals": bool(data.get("plurals", s["plurals"])),
+        "force_umlauts": bool(data.get("force_umlauts", s["force_umlauts"]))
+    }
 
-@app.route("/u/<username>")
-def public_profile(username):
-    db = get_db()
+    # Optional: only accept words from this category
+    category = data.get("category")
+    categories = None
+    if isinstance(category, str) and category:
+        categories = quiz_categories(resolve_category_key(category) or category)
 
-    # Check user exists
-    user = execute(db,
-        """SELECT id, username, xp, level, next_level_xp, streak, bio, avatar, country
-        FROM users
-        WHERE username = %s""",
-        (username,)
-    ).fetchone()
+    results = [
+        answer_index.check_item(item, data.get("mode"), categories, **settings) is not None
+        for item in answers
+    ]
 
+    return jsonify({"results": results, "correct": sum(results)})
 
-    if not user:
-        return render_template("404.html"), 404
-
-    # Load raw stats
-    raw_stats = execute(db, """
-        SELECT category, best_score, best_time
-        FROM scores
-        WHERE user_id = %s
-        AND category != 'failed_words'
-        ORDER BY category
-    """, (user["id"],)).fetchall()
+@app.route("/api/a1_files")
+def api_a1_files():
+    return jsonify(vocab_store.categories("A1"))
 
-    # Process stats
-    processed_stats = []
-    for row in raw_stats:
-        raw_cat = row["category"]
-        resolved = resolve_category_key(raw_cat) or raw_cat
+@app.route("/u/<username>")
+def public_profile(username):
+    # User and stats (one query, cached), rank from the ranking store
+    data = get_profile(username=username)
 
-        total_words = CATEGORY_SIZES.get(resolved, 0)
+    if not data:
+        return render_template("404.html"), 404
 
-        processed_stats.append({
-            "raw": raw_cat,
-            "category": resolved,
-            "best_score": row["best_score"],
-            "best_time": row["best_time"],
-            "total_words": total_words
-        })
+    user = data["profile"]
 
     # XP progress bar
     xp = user["xp"]
     next_xp = user["next_level_xp"]
     xp_percent = min(int((xp / next_xp) * 100), 100) if next_xp > 0 else 0
 
-    # Determine global rank
-    ranked_users = execute(db, """
-        SELECT id
-        FROM users
-        ORDER BY level DESC, xp DESC, streak DESC, created_at ASC
-    """).fetchall()
-
-    rank = 1
-    for row in ranked_users:
-        if row["id"] == user["id"]:
-            break
-        rank += 1
-
     return render_template("public_profile.html",
                            profile=user,
-                           stats=processed_stats,
+                           stats=data["stats"],
                            xp_percent=xp_percent,
-                           rank=rank,
+                           rank=get_user_rank(user["id"]),
                            category_sizes=CATEGORY_SIZES)
 
 @app.route("/rankings")
 def global_rankings():
-    db = get_db()
+    page = request.args.get("page", 1, type=int)
+    if page < 1:
+        page = 1
 
-    # Fetch all users
-    users = execute(db, """
-        SELECT id, username, level, xp, streak, country, created_at
-        FROM users
-        ORDER BY level DESC, xp DESC, streak DESC, created_at ASC
-        LIMIT 100
-    """).fetchall()
-
-    # Compute rank numbers (1-based)
-    ranked = []
-    rank = 1
-    for u in users:
-        ranked.append({
-            "rank": rank,
-            "username": u["username"],
-            "level": u["level"],
-            "xp": u["xp"],
-            "streak": u["streak"],
-            "country": u["country"],
-        })
-        rank += 1
+    ranked, total = get_rankings_page(page)
+    pages = max(1, -(-total // RANKINGS_PAGE_SIZE))
 
-    return render_template("rankings.html", users=ranked)
+    return render_template("rankings.html", users=ranked, page=page, pages=pages)
 
 @app.route("/upload_avatar", methods=["POST"])
 def upload_avatar():
+    global _avatar_pending
+
     if "user_id" not in session:
         return redirect(url_for("login"))
 
+    # fetch() uploads get JSON back, the account form gets a flash message
+    wants_json = request.accept_mimetypes.best == "application/json"
+
+    def reply(message, status="error", code=400):
+        if wants_json:
+            return jsonify({"status": status, "message": message}), code
+        flash(message)
+        if status == "error":
+            return redirect(request.referrer or url_for("account"))
+        return redirect(url_for("account"))
+
     file = request.files.get("avatar")
     if not file or file.filename == "":
-        flash("No file selected.")
-        return redirect(request.referrer or url_for("account"))
+        return reply("No file selected.")
 
     if not allowed_file(file.filename):
-        flash("Unsupported file type.")
-        return redirect(request.referrer or url_for("account"))
+        return reply("Unsupported file type.")
 
-    # Generate *.png filename
-    filename = secure_filename(f"{session['user_id']}_{uuid.uuid4().hex}.png")
-    save_path = os.path.join(UPLOAD_FOLDER, filename)
+    data = file.stream.read(AVATAR_MAX_BYTES + 1)
+    if len(data) > AVATAR_MAX_BYTES:
+        return reply(f"Image is too large (max {AVATAR_MAX_BYTES // (1024 * 1024)} MB).", code=413)
 
+    # Only reads the header, the pixels are decoded in the worker process
     try:
-        img = Image.open(file.stream).convert("RGBA")
+        with Image.open(io.BytesIO(data)) as img:
+            width, height = img.size
+    except Exception as e:
+        print("Avatar processing error:", e)
+        return reply("There was a problem processing your image.")
 
-        size = 256
-        img = ImageOps.fit(img, (size, size), Image.LANCZOS)
+    if width * height > AVATAR_MAX_PIXELS:
+        return reply("Image dimensions are too large.", code=413)
 
-        mask = Image.new("L", (size, size), 0)
-        draw = ImageDraw.Draw(mask)
-        draw.ellipse((0, 0, size, size), fill=255)
-        img.putalpha(mask)
+    with _avatar_lock:
+        if _avatar_pending >= AVATAR_MAX_PENDING:
+            return reply("Too many uploads right now, please try again in a minute.", code=503)
+        _avatar_pending += 1
 
-        img.save(save_path, format="PNG")
+    # Generate *.png filename (the WebP sizes are stored next to it)
+    filename = secure_filename(f"{session['user_id']}_{uuid.uuid4().hex}.png")
+    upload_path = os.path.join(UPLOAD_FOLDER, f"{filename}.upload")
+
+    try:
+        with open(upload_path, "wb") as f:
+            f.write(data)
 
+        future = submit_avatar(upload_path, UPLOAD_FOLDER, filename, AVATAR_MAX_PIXELS)
     except Exception as e:
         print("Avatar processing error:", e)
-        flash("There was a problem processing your image.")
-        return redirect(request.referrer or url_for("account"))
+        remove_avatar_files(filename)
+        with _avatar_lock:
+            _avatar_pending -= 1
+        return reply("There was a problem processing your image.", code=500)
 
-    # Store only the filename
-    db = get_db()
-    execute(db, "UPDATE users SET avatar = %s WHERE id = %s",
-            (filename, session["user_id"]))
-    db.commit()
+    future.add_done_callback(partial(avatar_done, session["user_id"], filename))
 
-    flash("Profile picture updated!")
-    return redirect(url_for("account"))
+    return reply("Your new profile picture is being processed and will show up in a moment.", "pending", 202)
 
 @app.route("/api/failed_words_count")
+@api_rate_limit
 def api_failed_words_count():
     if "user_id" not in session:
-        return jsonify({"count": 0})
+        return jsonify({"count": 0, "due": 0})
 
     db = get_db()
-    row = execute(db, """
-        SELECT COUNT(*) AS c
-        FROM failed_words
-        WHERE user_id = %s
-    """, (session["user_id"],)).fetchone()
+    row = run_query(db, "failed_words_count", (utcnow(), session["user_id"])).fetchone()
 
     count = row["c"] if row else 0
-    return jsonify({"count": count})
+    due = row["due"] if row else 0
+    return jsonify({"count": count, "due": due})
 
 if __name__ == "__main__":
     app.run(debug=False)
\ No newline at end of file
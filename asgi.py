@@ -0,0 +1,440 @@
+import asyncio, hmac, json, os, re, sqlite3
+from datetime import date, timedelta
+from http.cookies import SimpleCookie
+from urllib.parse import urlsplit
+
+from a2wsgi import WSGIMiddleware
+from itsdangerous import BadData, URLSafeTimedSerializer
+
+from app import (
+    app as flask_app, DB_DIALECT, SQLITE_PATH, DB_POOL_MIN, DB_POOL_MAX, LEADERBOARD_SIZE, MAX_FAILURE_BATCH,
+    CATEGORY_SIZES, resolve_category_key, leaderboard_cache, leaderboard_tags, progress_percentages, merge_failures,
+    failure_upserts, score_xp, sync_user_ranking, verified_score,
+    user_cache, user_tags, invalidate_user_cache, needs_https, api_retry_after
+)
+from cache import RedisCache
+from queries import compile_sql, query_sql
+from srs import utcnow
+
+# Optional async serving mode (see README, "Async API mode"):
+#
+#     uvicorn asgi:application --workers 4
+#
+# The JSON API routes below run on the event loop with asyncpg (PostgreSQL) or
+# aiosqlite (SQLite). Every other path, including all template pages, goes to the
+# normal Flask app, which runs in a thread pool (ASGI_WSGI_THREADS per process).
+
+class AsyncDatabase:
+    # asyncpg pool on PostgreSQL, a queue of aiosqlite connections on SQLite.
+    # Queries use the same "%s" / named placeholders as the rest of the app.
+    # Drivers are imported on open(), so only the one in use has to be installed.
+
+    def __init__(self, dialect):
+        self.dialect = dialect
+        self.pool = None
+
+    async def open(self):
+        if self.dialect == "postgres":
+            import asyncpg
+            self.pool = await asyncpg.create_pool(
+                os.environ["DATABASE_URL"], min_size=DB_POOL_MIN, max_size=DB_POOL_MAX
+            )
+        else:
+            import aiosqlite
+            self.pool = asyncio.Queue()
+            for _ in range(DB_POOL_MAX):
+                conn = await aiosqlite.connect(SQLITE_PATH)
+                conn.row_factory = sqlite3.Row
+                await conn.execute("PRAGMA foreign_keys = ON")
+                self.pool.put_nowait(conn)
+
+    async def close(self):
+        if self.dialect == "postgres":
+            await self.pool.close()
+        else:
+            while not self.pool.empty():
+                await self.pool.get_nowait().close()
+
+    def connection(self):
+        return AsyncConnection(self)
+
+
+class AsyncConnection:
+    # async with db.connection() as conn: ... (commits on success, rolls back on error)
+
+    def __init__(self, db):
+        self.db = db
+        self.conn = None
+        self.tx = None
+
+    async def __aenter__(self):
+        if self.db.dialect == "postgres":
+            self.conn = await self.db.pool.acquire()
+            self.tx = self.conn.transaction()
+            await self.tx.start()
+        else:
+            self.conn = await self.db.pool.get()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        try:
+            if self.db.dialect == "postgres":
+                if exc_type is None:
+                    await self.tx.commit()
+                else:
+                    await self.tx.rollback()
+            elif exc_type is None:
+                await self.conn.commit()
+            else:
+                await self.conn.rollback()
+        finally:
+            if self.db.dialect == "postgres":
+                await self.db.pool.release(self.conn)
+            else:
+                self.db.pool.put_nowait(self.conn)
+
+    def _compile(self, query, params):
+        if self.db.dialect == "postgres":
+            # asyncpg uses $1, $2, ... and prepares (and caches) every statement itself
+            sql, names = compile_sql(query, "numeric")
+            if names is not None:
+                params = [params[n] for n in names]
+            return sql, list(params)
+        return compile_sql(query, "sqlite")[0], params
+
+    async def fetchall(self, query, params=()):
+        sql, params = self._compile(query, params)
+        if self.db.dialect == "postgres":
+            return await self.conn.fetch(sql, *params)
+        async with self.conn.execute(sql, params) as cur:
+            return await cur.fetchall()
+
+    async def fetchone(self, query, params=()):
+        rows = await self.fetchall(query, params)
+        return rows[0] if rows else None
+
+    async def execute(self, query, params=()):
+        sql, params = self._compile(query, params)
+        if self.db.dialect == "postgres":
+            await self.conn.execute(sql, *params)
+        else:
+            await self.conn.execute(sql, params)
+
+    def named(self, name):
+        return query_sql(name, "numeric" if self.db.dialect == "postgres" else self.db.dialect)
+
+
+database = AsyncDatabase(DB_DIALECT)
+
+
+# Sessions + CSRF, compatible with the Flask side
+
+session_serializer = flask_app.session_interface.get_signing_serializer(flask_app)
+csrf_serializer = URLSafeTimedSerializer(
+    flask_app.config.get("WTF_CSRF_SECRET_KEY") or flask_app.secret_key, salt="wtf-csrf-token"
+)
+SESSION_MAX_AGE = int(flask_app.permanent_session_lifetime.total_seconds())
+CSRF_TIME_LIMIT = flask_app.config.get("WTF_CSRF_TIME_LIMIT", 3600)
+
+
+def load_session(headers):
+    cookie = SimpleCookie(headers.get("cookie", ""))
+    morsel = cookie.get(flask_app.config["SESSION_COOKIE_NAME"])
+    if not morsel:
+        return {}
+
+    try:
+        return session_serializer.loads(morsel.value, max_age=SESSION_MAX_AGE)
+    except BadData:
+        return {}
+
+
+def csrf_valid(session, headers, scheme):
+    if not flask_app.config.get("WTF_CSRF_ENABLED", True):
+        return True
+
+    token = headers.get("x-csrftoken") or headers.get("x-csrf-token")
+    if not token or "csrf_token" not in session:
+        return False
+
+    try:
+        raw = csrf_serializer.loads(token, max_age=CSRF_TIME_LIMIT)
+    except BadData:
+        return False
+
+    if not hmac.compare_digest(session["csrf_token"], raw):
+        return False
+
+    # Same referrer check as Flask-WTF on HTTPS
+    if scheme == "https" and flask_app.config.get("WTF_CSRF_SSL_STRICT", True):
+        referrer = urlsplit(headers.get("referer", ""))
+        if referrer.scheme != "https" or referrer.netloc != headers.get("host"):
+            return False
+
+    return True
+
+
+class Request:
+    def __init__(self, scope, receive):
+        self.scope = scope
+        self.receive = receive
+        self.headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope["headers"]}
+        self.session = load_session(self.headers)
+        self.scheme = self.headers.get("x-forwarded-proto", scope.get("scheme", "http"))
+
+    async def json(self, limit=1024 * 1024):
+        body = b""
+        while True:
+            message = await self.receive()
+            body += message.get("body", b"")
+            if len(body) > limit:
+                return None
+            if not message.get("more_body"):
+                break
+
+        try:
+            return json.loads(body or b"null")
+        except ValueError:
+            return None
+
+
+async def send_json(send, data, status=200, headers=()):
+    body = json.dumps(data).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            *headers,
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def send_redirect(send, location):
+    await send({
+        "type": "http.response.start",
+        "status": 302,
+        "headers": [(b"location", location.encode("latin-1")), (b"content-length", b"0")],
+    })
+    await send({"type": "http.response.body", "body": b""})
+
+
+# With Redis, cache (and rate limit) calls are network round trips: keep them
+# off the event loop
+REDIS_CACHE = isinstance(user_cache, RedisCache)
+
+
+async def cached(function, *args, **kwargs):
+    if REDIS_CACHE:
+        return await asyncio.to_thread(function, *args, **kwargs)
+    return function(*args, **kwargs)
+
+
+# Routes (same responses as the Flask versions in app.py)
+
+async def api_progress(request):
+    if "user_id" not in request.session:
+        return {}
+
+    user_id = request.session["user_id"]
+    progress = await cached(user_cache.get, f"progress:{user_id}")
+
+    if progress is None:
+        async with database.connection() as conn:
+            rows = await conn.fetchall(conn.named("progress_scores"), (user_id,))
+
+        progress = progress_percentages(rows)
+        await cached(user_cache.set, f"progress:{user_id}", progress, tags=user_tags(user_id))
+
+    return progress
+
+
+async def api_failed_words_count(request):
+    if "user_id" not in request.session:
+        return {"count": 0, "due": 0}
+
+    async with database.connection() as conn:
+        row = await conn.fetchone(conn.named("failed_words_count"), (utcnow(), request.session["user_id"]))
+
+    return {"count": row["c"] if row else 0, "due": row["due"] if row else 0}
+
+
+async def api_leaderboard(request, category):
+    resolved_key = resolve_category_key(category) or category
+    total = CATEGORY_SIZES.get(resolved_key, 0)
+
+    top = await cached(leaderboard_cache.get, resolved_key)
+
+    if top is None:
+        async with database.connection() as conn:
+            rows = await conn.fetchall(conn.named("leaderboard_top"), (resolved_key, total, LEADERBOARD_SIZE))
+
+        top = [dict(r) for r in rows]
+        await cached(leaderboard_cache.set, resolved_key, top, tags=leaderboard_tags(top))
+
+    return top
+
+
+async def save_failures_for(user_id, items):
+    rows = merge_failures(items)
+
+    async with database.connection() as conn:
+        for query, params in failure_upserts(user_id, rows):
+            await conn.execute(query, params)
+
+    await cached(invalidate_user_cache, user_id)
+    return len(rows)
+
+
+async def save_failure(request):
+    if "user_id" not in request.session:
+        return {"status": "error", "message": "not_logged_in"}
+
+    data = await request.json()
+    if not isinstance(data, dict) or not data.get("word") or not data.get("category"):
+        return {"error": "invalid_data"}, 400
+
+    await save_failures_for(request.session["user_id"], [{
+        "category": data["category"],
+        "word": data["word"],
+        "english": data.get("english"),
+        "gender": data.get("gender"),
+        "plural": data.get("plural")
+    }])
+    return {"status": "ok"}
+
+
+async def save_failures(request):
+    if "user_id" not in request.session:
+        return {"status": "error", "message": "not_logged_in"}
+
+    data = await request.json() or {}
+    failures = data.get("failures") if isinstance(data, dict) else None
+
+    if not isinstance(failures, list) or len(failures) > MAX_FAILURE_BATCH:
+        return {"error": "invalid_data"}, 400
+
+    items = [f for f in failures if isinstance(f, dict)]
+    saved = await save_failures_for(request.session["user_id"], items)
+    return {"status": "ok", "saved": saved}
+
+
+async def save_score(request):
+    if "user_id" not in request.session:
+        return {"status": "error", "message": "not_logged_in"}
+
+    data = await request.json()
+    if not isinstance(data, dict):
+        return {"error": "missing_data"}, 400
+
+    category = str(data.get("category", "")).strip()
+    score = data.get("score")
+    time = data.get("time")
+
+    if not category or score is None or time is None:
+        return {"error": "missing_data"}, 400
+
+    if "marathon" in category:
+        category = "a1_marathon"
+
+    # Prevent saving failed_words as score
+    if category == "failed_words":
+        return {"status": "ignored"}
+
+    # The score is what the server counts from the submitted answers
+    score = verified_score(resolve_category_key(category) or category, data)
+    if score is None:
+        return {"error": "missing_data"}, 400
+
+    user_id = request.session["user_id"]
+    today = date.today()
+
+    async with database.connection() as conn:
+        record = await conn.fetchone(conn.named("save_best_score"), (user_id, category, score, time))
+        earned_new_record = record is not None
+
+        xp_gain = score_xp(category, score, time) if earned_new_record else 0
+
+        user = await conn.fetchone(conn.named("award_xp"), {
+            "today": today,
+            "yesterday": today - timedelta(days=1),
+            "xp_gain": xp_gain,
+            "now": utcnow(),
+            "user_id": user_id
+        })
+
+    await cached(invalidate_user_cache, user_id)
+
+    # Ranking store calls may talk to Redis, keep them off the event loop
+    await asyncio.to_thread(sync_user_ranking, None, user_id, dict(user))
+
+    if not earned_new_record:
+        return {"status": "no_xp"}
+
+    return {"status": "ok"}
+
+
+ROUTES = [
+    ("GET", re.compile(r"^/api/progress$"), api_progress),
+    ("GET", re.compile(r"^/api/failed_words_count$"), api_failed_words_count),
+    ("GET", re.compile(r"^/api/leaderboard/(?P<category>[^/]+)$"), api_leaderboard),
+    ("POST", re.compile(r"^/save_failure$"), save_failure),
+    ("POST", re.compile(r"^/save_failures$"), save_failures),
+    ("POST", re.compile(r"^/save_score$"), save_score),
+]
+
+flask_asgi = WSGIMiddleware(flask_app, workers=int(os.getenv("ASGI_WSGI_THREADS", "10")))
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await database.open()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await database.close()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return await lifespan(receive, send)
+
+    if scope["type"] == "http":
+        for method, pattern, handler in ROUTES:
+            match = pattern.match(scope["path"])
+            if not match or scope["method"] != method:
+                continue
+
+            request = Request(scope, receive)
+
+            if method == "POST" and not csrf_valid(request.session, request.headers, request.scheme):
+                return await send_json(send, {"error": "csrf_failed"}, 400)
+
+            # Same HTTPS redirect and API rate limit as the Flask routes
+            host = request.headers.get("host", "")
+            if needs_https(host, request.headers.get("x-forwarded-proto", "http")):
+                query = scope.get("query_string", b"").decode("latin-1")
+                return await send_redirect(send, f"https://{host}{scope['path']}" + (f"?{query}" if query else ""))
+
+            client = scope.get("client") or (None, None)
+            retry_after = await cached(api_retry_after, request.session, client[0])
+            if retry_after is not None:
+                return await send_json(send, {"error": "rate_limited"}, 429, [(b"retry-after", str(retry_after).encode())])
+
+            try:
+                result = await handler(request, **match.groupdict())
+            except Exception as e:
+                print("Async API error:", e)
+                return await send_json(send, {"error": "server_error"}, 500)
+
+            if isinstance(result, tuple):
+                return await send_json(send, *result)
+            return await send_json(send, result)
+
+    # Template pages, static files and every other route
+    return await flask_asgi(scope, receive, send)
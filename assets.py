@@ -0,0 +1,68 @@
+import gzip, hashlib, json, os, shutil
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Static asset build: copies static/js, static/css and static/data to static/dist
+# with a content hash in the filename (main.js -> main.3f2a9c1b0d.js) and writes
+# precompressed .gz / .br files next to each one. manifest.json maps the original
+# path to the hashed one. Build it on deploy with:
+#
+#     flask --app app build-assets
+
+ASSET_DIRS = ("js", "css", "data")
+COMPRESS_EXTENSIONS = (".js", ".css", ".json")
+
+
+def hashed_name(path, digest):
+    base, ext = os.path.splitext(path)
+    return f"{base}.{digest}{ext}"
+
+
+def build(static_dir="static", out_dir="static/dist", log=print):
+    if os.path.isdir(out_dir):
+        shutil.rmtree(out_dir)
+
+    manifest = {}
+
+    for folder in ASSET_DIRS:
+        for root, _, files in os.walk(os.path.join(static_dir, folder)):
+            for file in sorted(files):
+                source = os.path.join(root, file)
+                name = os.path.relpath(source, static_dir).replace(os.sep, "/")
+
+                with open(source, "rb") as f:
+                    data = f.read()
+
+                target = hashed_name(name, hashlib.sha256(data).hexdigest()[:10])
+                path = os.path.join(out_dir, target)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+
+                with open(path, "wb") as f:
+                    f.write(data)
+
+                if file.endswith(COMPRESS_EXTENSIONS):
+                    # mtime=0 keeps the .gz identical between builds
+                    with open(path + ".gz", "wb") as f:
+                        f.write(gzip.compress(data, compresslevel=9, mtime=0))
+                    if brotli:
+                        with open(path + ".br", "wb") as f:
+                            f.write(brotli.compress(data, quality=11))
+
+                manifest[name] = target
+
+    with open(os.path.join(out_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    log(f"Built {len(manifest)} assets in {out_dir}")
+    return manifest
+
+
+def load_manifest(out_dir="static/dist"):
+    try:
+        with open(os.path.join(out_dir, "manifest.json")) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
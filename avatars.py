@@ -0,0 +1,69 @@
+import os
+from PIL import Image, ImageOps, ImageDraw
+
+# Avatar processing, run in a separate process so a large upload doesn't
+# block a web worker. Every avatar is stored as:
+#
+#     <base>.png          256px PNG fallback (this name is saved in users.avatar)
+#     <base>_<size>.webp  one WebP per size in AVATAR_SIZES
+
+AVATAR_SIZES = (48, 128, 256)
+FALLBACK_SIZE = 256
+
+
+def avatar_variants(filename):
+    # All files that belong to the avatar stored as <base>.png
+    base = filename.rsplit(".", 1)[0]
+    return [filename] + [f"{base}_{size}.webp" for size in AVATAR_SIZES]
+
+
+def variant_name(filename, size, webp=True):
+    if not webp or size not in AVATAR_SIZES:
+        return filename
+    return f"{filename.rsplit('.', 1)[0]}_{size}.webp"
+
+
+def circle(img):
+    size = img.size[0]
+    mask = Image.new("L", (size, size), 0)
+    draw = ImageDraw.Draw(mask)
+    draw.ellipse((0, 0, size, size), fill=255)
+    img.putalpha(mask)
+    return img
+
+
+def process_avatar(src_path, folder, filename, max_pixels):
+    # Runs in the worker process. Returns the stored filename.
+    Image.MAX_IMAGE_PIXELS = max_pixels
+
+    try:
+        with Image.open(src_path) as img:
+            # Let the JPEG decoder scale down while decoding (no-op for other formats)
+            img.draft("RGB", (FALLBACK_SIZE * 2, FALLBACK_SIZE * 2))
+            img = img.convert("RGBA")
+
+        img = ImageOps.fit(img, (FALLBACK_SIZE, FALLBACK_SIZE), Image.LANCZOS)
+        base = filename.rsplit(".", 1)[0]
+
+        # Write to temp names first so a half-written avatar is never served
+        written = []
+        for size in sorted(AVATAR_SIZES, reverse=True):
+            resized = img if size == FALLBACK_SIZE else img.resize((size, size), Image.LANCZOS)
+            path = os.path.join(folder, f"{base}_{size}.webp")
+            circle(resized.copy()).save(path + ".tmp", format="WEBP", quality=85, method=4)
+            written.append(path)
+
+        path = os.path.join(folder, filename)
+        circle(img).save(path + ".tmp", format="PNG", optimize=True)
+        written.append(path)
+
+        for path in written:
+            os.replace(path + ".tmp", path)
+
+    finally:
+        try:
+            os.remove(src_path)
+        except OSError:
+            pass
+
+    return filename
@@ -0,0 +1,353 @@
+import argparse, json, os, random, re, sys, tempfile, threading, time
+from datetime import date, timedelta
+
+# Load test for the routes that take most of the traffic.
+#
+#     python bench/load_test.py                      # temp SQLite database
+#     python bench/load_test.py --requests 5000 --concurrency 8
+#     DATABASE_URL=postgres://... python bench/load_test.py --postgres
+#
+# Runs offline: requests go through Flask's test client (no server, no network),
+# the rate limiter uses memory://, and every simulated user has a logged-in session.
+# Reports p50/p95/p99 latency, throughput and SQL queries per request per route.
+#
+#     python bench/load_test.py --save bench/baseline.json
+#     python bench/load_test.py --compare bench/baseline.json   # exit 1 on regression
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Relative weights of the simulated requests (roughly one quiz session)
+TRAFFIC = [
+    ("GET /api/progress", 20),
+    ("GET /api/settings", 15),
+    ("GET /api/leaderboard/<category>", 15),
+    ("POST /save_failure", 15),
+    ("POST /save_score", 10),
+    ("GET /rankings", 10),
+    ("GET /u/<username>", 15),
+]
+
+# A1 category names, filled in from the vocabulary once app.py is imported
+CATEGORIES = []
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Latency benchmark for the hot endpoints")
+    parser.add_argument("--requests", type=int, default=3000, help="total requests (default 3000)")
+    parser.add_argument("--concurrency", type=int, default=4, help="client threads (default 4)")
+    parser.add_argument("--users", type=int, default=500, help="seeded users (default 500)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--postgres", action="store_true",
+                        help="use DATABASE_URL instead of a temp SQLite file (writes bench_* users)")
+    parser.add_argument("--output", help="also write the report to this file")
+    parser.add_argument("--save", help="save results as JSON (baseline)")
+    parser.add_argument("--compare", help="compare p95 latency and queries with a saved baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed p95 slowdown vs. baseline (default 0.25 = 25%%)")
+    return parser.parse_args()
+
+
+def setup_environment(args):
+    # Must run before app.py is imported
+    os.chdir(ROOT)
+    sys.path.insert(0, ROOT)
+    os.environ.pop("REDIS_URL", None)
+
+    if args.postgres:
+        if "DATABASE_URL" not in os.environ:
+            sys.exit("--postgres needs DATABASE_URL")
+    else:
+        os.environ.pop("DATABASE_URL", None)
+        os.environ["SQLITE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="vokabel-bench-"), "bench.db")
+
+
+class QueryCounter:
+    # SQL statements per thread (one request at a time per thread)
+    def __init__(self):
+        self.local = threading.local()
+
+    def add(self, n=1):
+        self.local.count = getattr(self.local, "count", 0) + n
+
+    def take(self):
+        count = getattr(self.local, "count", 0)
+        self.local.count = 0
+        return count
+
+
+def install_query_counter(A, counter):
+    # Replace the app's pool with one whose connections count their queries
+    from db_pool import ConnectionPool, sqlite_connect
+
+    if A.DB_DIALECT == "sqlite":
+        connect_sqlite = sqlite_connect(A.SQLITE_PATH)
+
+        def trace(sql):
+            if not re.match(r"\s*(BEGIN|COMMIT|ROLLBACK)\b", sql, re.I):
+                counter.add()
+
+        def connect():
+            conn = connect_sqlite()
+            conn.set_trace_callback(trace)
+            return conn
+    else:
+        import psycopg2
+        from psycopg2.extras import RealDictCursor
+        from queries import PreparingConnection
+
+        class CountingCursor(RealDictCursor):
+            def execute(self, query, vars=None):
+                counter.add()
+                return super().execute(query, vars)
+
+            def executemany(self, query, vars_list):
+                counter.add()
+                return super().executemany(query, vars_list)
+
+        def connect():
+            return psycopg2.connect(
+                os.environ["DATABASE_URL"],
+                connection_factory=PreparingConnection,
+                cursor_factory=CountingCursor
+            )
+
+    A._db_pool = ConnectionPool(
+        connect,
+        min_size=A.DB_POOL_MIN,
+        max_size=A.DB_POOL_MAX,
+        timeout=A.DB_POOL_TIMEOUT,
+        health_check_interval=A.DB_POOL_HEALTH_CHECK
+    )
+    A._db_pool_pid = os.getpid()
+
+
+def seed(A, args, rng):
+    # Users with some progress, settings, failed words and leaderboard entries
+    with A.app.app_context():
+        db = A.get_db()
+        A.migrate(db, A.DB_DIALECT, log=lambda message: None)
+
+        bench_ids = [r["id"] for r in A.execute(db, "SELECT id FROM users WHERE username LIKE %s ESCAPE '!'", ("bench!_%",)).fetchall()]
+        for user_id in bench_ids:
+            for table in ("failed_words", "scores", "leaderboard", "leaderboard_best", "user_settings"):
+                A.execute(db, f"DELETE FROM {table} WHERE user_id = %s", (user_id,))
+            A.execute(db, "DELETE FROM users WHERE id = %s", (user_id,))
+        db.commit()
+
+        # Cheap hash: nobody logs in, sessions are created directly
+        password = A.generate_password_hash("bench-password", method="pbkdf2:sha256:1000")
+        today = date.today()
+        # Same format as the app's own due_at writes (srs.utcnow), so the seeded
+        # words compare correctly with the due check on SQLite
+        now = A.utcnow()
+
+        A.execute_many(db, """
+            INSERT INTO users (username, hash, xp, level, next_level_xp, streak, last_active, country)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+        """, [
+            (f"bench_{i}", password, rng.randint(0, 119), rng.randint(1, 30), 120,
+             rng.randint(0, 20), today - timedelta(days=rng.choice([0, 1, 2])), rng.choice(["de", "at", "ch", None]))
+            for i in range(args.users)
+        ])
+
+        users = [dict(r) for r in A.execute(db, "SELECT id, username FROM users WHERE username LIKE %s ESCAPE '!'", ("bench!_%",)).fetchall()]
+
+        scores, failures, leaderboard, settings = [], [], [], []
+        for user in users:
+            for category in rng.sample(CATEGORIES, 4):
+                key = A.resolve_category_key(category)
+                total = A.CATEGORY_SIZES[key]
+                score = rng.randint(total // 2, total)
+                scores.append((user["id"], category, score, round(rng.uniform(20, 120), 2)))
+                if score == total:
+                    leaderboard.append((user["id"], user["username"], key, score, round(rng.uniform(20, 120), 2)))
+            for n in range(rng.randint(0, 30)):
+                failures.append((user["id"], "A1_colors", f"wort{n}", f"word {n}", now))
+            settings.append((user["id"],))
+
+        A.execute_many(db, "INSERT INTO scores (user_id, category, best_score, best_time) VALUES (%s, %s, %s, %s)", scores)
+        A.execute_many(db, "INSERT INTO leaderboard_best (user_id, username, category, score, time) VALUES (%s, %s, %s, %s, %s)", leaderboard)
+        A.execute_many(db, "INSERT INTO failed_words (user_id, category, word, english, due_at) VALUES (%s, %s, %s, %s, %s)", failures)
+        A.execute_many(db, "INSERT INTO user_settings (user_id) VALUES (%s)", settings)
+        db.commit()
+
+    return users
+
+
+def make_request(A, client, user, rng):
+    route = rng.choices([name for name, _ in TRAFFIC], weights=[w for _, w in TRAFFIC])[0]
+    category = rng.choice(CATEGORIES)
+
+    if route == "GET /api/progress":
+        return route, client.get("/api/progress")
+    if route == "GET /api/settings":
+        return route, client.get("/api/settings")
+    if route == "GET /api/leaderboard/<category>":
+        return route, client.get(f"/api/leaderboard/{category}")
+    if route == "POST /save_failure":
+        n = rng.randint(0, 60)
+        return route, client.post("/save_failure", json={
+            "category": "A1_" + category, "word": f"wort{n}", "english": f"word {n}"
+        })
+    if route == "POST /save_score":
+        # The score is counted from the answers on the server (first accepted meaning)
+        level, _, name = A.resolve_category_key(category).partition("_")
+        words = A.vocab_store.words(level, name)
+        answered = rng.sample(words, rng.randint(len(words) // 2, len(words)))
+        return route, client.post("/save_score", json={
+            "category": category, "score": len(answered), "time": round(rng.uniform(15, 120), 2),
+            "mode": "de-to-en",
+            "answers": [{"word": w.german, "category": w.category, "answer": w.english.split("/")[0]} for w in answered]
+        })
+    if route == "GET /rankings":
+        return route, client.get(f"/rankings?page={rng.choice([1, 1, 1, 2, 3])}")
+    return route, client.get(f"/u/{rng.choice(A.bench_usernames)}")
+
+
+def percentile(values, p):
+    # Nearest rank
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(p / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def run(A, users, args):
+    counter = QueryCounter()
+    install_query_counter(A, counter)
+
+    results = {}
+    lock = threading.Lock()
+    per_thread = [args.requests // args.concurrency + (1 if i < args.requests % args.concurrency else 0)
+                  for i in range(args.concurrency)]
+
+    def worker(thread_index, count):
+        rng = random.Random(args.seed * 1000 + thread_index)
+
+        # Each thread drives its own share of the users, one client (cookie jar) per user
+        mine = users[thread_index::args.concurrency] or users
+        clients = {}
+
+        for _ in range(count):
+            user = rng.choice(mine)
+            client = clients.get(user["id"])
+            if client is None:
+                client = clients[user["id"]] = A.app.test_client()
+                with client.session_transaction() as session:
+                    session["user_id"] = user["id"]
+                    session["username"] = user["username"]
+
+            counter.take()
+            start = time.perf_counter()
+            route, response = make_request(A, client, user, rng)
+            elapsed = (time.perf_counter() - start) * 1000
+            queries = counter.take()
+
+            with lock:
+                stats = results.setdefault(route, {"latencies": [], "queries": 0, "errors": 0})
+                stats["latencies"].append(elapsed)
+                stats["queries"] += queries
+                if response.status_code >= 400:
+                    stats["errors"] += 1
+
+    threads = [threading.Thread(target=worker, args=(i, n)) for i, n in enumerate(per_thread)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    summary = {"requests": args.requests, "concurrency": args.concurrency, "seconds": wall,
+               "throughput": args.requests / wall if wall else 0.0, "routes": {}}
+    everything = []
+
+    for route, stats in sorted(results.items()):
+        latencies = stats["latencies"]
+        everything.extend(latencies)
+        summary["routes"][route] = {
+            "count": len(latencies),
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "queries": stats["queries"] / len(latencies),
+            "errors": stats["errors"],
+        }
+
+    summary["p50"] = percentile(everything, 50)
+    summary["p95"] = percentile(everything, 95)
+    summary["p99"] = percentile(everything, 99)
+    return summary
+
+
+def format_report(summary, dialect):
+    lines = [
+        f"{summary['requests']} requests, {summary['concurrency']} threads, {dialect}: "
+        f"{summary['throughput']:.1f} req/s ({summary['seconds']:.2f}s)",
+        "",
+        f"{'route':34} {'count':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>8} {'errors':>6}",
+    ]
+    for route, r in summary["routes"].items():
+        lines.append(f"{route:34} {r['count']:>6} {r['p50']:>8.2f} {r['p95']:>8.2f} {r['p99']:>8.2f} "
+                     f"{r['queries']:>8.2f} {r['errors']:>6}")
+    lines.append(f"{'all':34} {summary['requests']:>6} {summary['p50']:>8.2f} {summary['p95']:>8.2f} {summary['p99']:>8.2f}")
+    return "\n".join(lines)
+
+
+def compare(summary, baseline, tolerance):
+    # Regression = p95 slower than allowed, more queries per request, or new errors
+    problems = []
+    for route, old in baseline["routes"].items():
+        new = summary["routes"].get(route)
+        if not new:
+            continue
+        if new["p95"] > old["p95"] * (1 + tolerance):
+            problems.append(f"{route}: p95 {old['p95']:.2f} -> {new['p95']:.2f} ms")
+        if new["queries"] > old["queries"] + 0.01:
+            problems.append(f"{route}: queries/request {old['queries']:.2f} -> {new['queries']:.2f}")
+        if new["errors"] > old["errors"]:
+            problems.append(f"{route}: errors {old['errors']} -> {new['errors']}")
+    return problems
+
+
+def main():
+    args = parse_args()
+    setup_environment(args)
+
+    import app as A
+
+    A.app.config["WTF_CSRF_ENABLED"] = False
+    A.app.config["SESSION_COOKIE_SECURE"] = False
+
+    CATEGORIES[:] = A.vocab_store.categories("A1")
+
+    rng = random.Random(args.seed)
+    users = seed(A, args, rng)
+    A.bench_usernames = [u["username"] for u in users]
+
+    summary = run(A, users, args)
+    report = format_report(summary, A.DB_DIALECT)
+    print(report)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(summary, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            problems = compare(summary, json.load(f), args.tolerance)
+        if problems:
+            print("\nRegressions:")
+            for problem in problems:
+                print("  " + problem)
+            sys.exit(1)
+        print("\nNo regressions against", args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+import json, threading, time
+from collections import OrderedDict
+
+# Caches with the same interface in two flavours:
+#
+#   TTLCache    in-process, with a max size (least recently used entries are
+#               evicted first). Every gunicorn worker has its own copy, so the TTL
+#               also bounds how long another worker can serve a stale value.
+#   RedisCache  one copy in Redis shared by all workers (used when REDIS_URL is set).
+#
+# Both support tags (invalidate_tag() drops every entry set with that tag) and
+# get_or_set(), which runs the loader only once when many requests miss the same
+# key at the same time. get_or_set() also takes tags as a function of the loaded
+# value. None is never cached.
+
+_MISSING = object()
+
+
+def _tags_for(tags, value):
+    return tags(value) if callable(tags) else tags
+
+
+class TTLCache:
+    def __init__(self, maxsize=1024, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()   # key -> (expires_at, value, tags)
+        self._tags = {}              # tag -> set of keys
+        self._flights = {}           # key -> lock held while the value is loaded
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _drop(self, key):
+        item = self._data.pop(key, None)
+        if item is None:
+            return
+
+        for tag in item[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def _lookup(self, key):
+        item = self._data.get(key, _MISSING)
+
+        if item is _MISSING:
+            return _MISSING
+
+        if item[0] < time.monotonic():
+            self._drop(key)
+            return _MISSING
+
+        self._data.move_to_end(key)
+        return item[1]
+
+    def get(self, key, default=None):
+        with self._lock:
+            value = self._lookup(key)
+
+            if value is _MISSING:
+                self.misses += 1
+                return default
+
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None, tags=()):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+
+        with self._lock:
+            self._drop(key)
+            self._data[key] = (expires_at, value, tuple(tags))
+
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+
+            while len(self._data) > self.maxsize:
+                self._drop(next(iter(self._data)))
+
+    def get_or_set(self, key, loader, ttl=None, tags=()):
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        # Single flight: other threads missing the same key wait for this load
+        with self._lock:
+            flight = self._flights.setdefault(key, threading.Lock())
+
+        try:
+            with flight:
+                with self._lock:
+                    value = self._lookup(key)
+
+                if value is _MISSING:
+                    value = loader()
+                    if value is not None:
+                        self.set(key, value, ttl, _tags_for(tags, value))
+        finally:
+            # Also when the loader raised, or the lock would stay behind forever
+            with self._lock:
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+
+        return value
+
+    def delete(self, key):
+        with self._lock:
+            self._drop(key)
+
+    def invalidate_tag(self, tag):
+        with self._lock:
+            for key in list(self._tags.get(tag, ())):
+                self._drop(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._tags.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class RedisCache:
+    # Values are stored as JSON (dates come back as strings) and expire in Redis.
+    # A tag is a Redis set with the keys that were stored with it.
+
+    def __init__(self, client, prefix, ttl=300, lock_timeout=5.0):
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+        self.lock_timeout = lock_timeout
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, key):
+        return f"{self.prefix}:{key}"
+
+    def _tag_key(self, tag):
+        return f"{self.prefix}:tag:{tag}"
+
+    def get(self, key, default=None):
+        raw = self.client.get(self._key(key))
+
+        if raw is None:
+            self.misses += 1
+            return default
+
+        self.hits += 1
+        return json.loads(raw)
+
+    def set(self, key, value, ttl=None, tags=()):
+        ttl = self.ttl if ttl is None else ttl
+        name = self._key(key)
+
+        pipe = self.client.pipeline()
+        pipe.set(name, json.dumps(value, default=str), ex=ttl)
+        for tag in tags:
+            pipe.sadd(self._tag_key(tag), name)
+            pipe.expire(self._tag_key(tag), max(ttl, self.ttl))
+        pipe.execute()
+
+    def get_or_set(self, key, loader, ttl=None, tags=()):
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        # Single flight across workers: whoever gets the lock loads the value,
+        # everyone else polls for it until the lock is gone or times out
+        lock = self._key(key) + ":lock"
+
+        if self.client.set(lock, "1", nx=True, px=int(self.lock_timeout * 1000)):
+            try:
+                value = loader()
+                if value is not None:
+                    self.set(key, value, ttl, _tags_for(tags, value))
+                return value
+            finally:
+                self.client.delete(lock)
+
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(0.02)
+
+            raw = self.client.get(self._key(key))
+            if raw is not None:
+                return json.loads(raw)
+            if not self.client.exists(lock):
+                break
+
+        # The other loader failed or returned None
+        return loader()
+
+    def delete(self, key):
+        self.client.delete(self._key(key))
+
+    def invalidate_tag(self, tag):
+        tag_key = self._tag_key(tag)
+        keys = self.client.smembers(tag_key)
+        self.client.delete(tag_key, *keys)
+
+    def clear(self):
+        # Scans the whole keyspace: for maintenance, use tags on request paths
+        keys = list(self.client.scan_iter(match=f"{self.prefix}:*"))
+        if keys:
+            self.client.delete(*keys)
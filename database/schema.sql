@@ -1,10 +1,36 @@
+-- Reference copy of the current schema (SQLite syntax).
+-- Databases are created and upgraded with `flask --app app migrate` (see migrations.py).
+
 CREATE TABLE IF NOT EXISTS users (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     username TEXT NOT NULL UNIQUE,
     hash TEXT NOT NULL,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    xp INTEGER NOT NULL DEFAULT 0,
+    level INTEGER NOT NULL DEFAULT 1,
+    next_level_xp INTEGER NOT NULL DEFAULT 120,
+    streak INTEGER NOT NULL DEFAULT 0,
+    last_active DATE,
+    bio TEXT,
+    avatar TEXT,
+    country TEXT,
+    ranking_changed_at TIMESTAMP
+);
+
+-- Sort key of /rankings and the public profile rank
+CREATE INDEX IF NOT EXISTS users_ranking ON users (level DESC, xp DESC, streak DESC, created_at);
+
+-- Users changed since a time, for in-memory rankings to catch up (rankings.py)
+CREATE INDEX IF NOT EXISTS users_ranking_changed ON users (ranking_changed_at);
+
+-- Accounts deleted since a time, for the same catch-up
+CREATE TABLE IF NOT EXISTS deleted_users (
+    user_id INTEGER NOT NULL,
+    deleted_at TIMESTAMP NOT NULL
 );
 
+CREATE INDEX IF NOT EXISTS deleted_users_deleted_at ON deleted_users (deleted_at);
+
 CREATE TABLE IF NOT EXISTS scores (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     user_id INTEGER NOT NULL,
@@ -14,11 +40,19 @@ CREATE TABLE IF NOT EXISTS scores (
     FOREIGN KEY(user_id) REFERENCES users(id)
 );
 
+-- One best score per (user, category) so save_score can upsert
+CREATE UNIQUE INDEX IF NOT EXISTS scores_user_category ON scores (user_id, category);
+
 CREATE TABLE IF NOT EXISTS user_settings (
     user_id INTEGER PRIMARY KEY,
-    sound_enabled INTEGER DEFAULT 1,
+    sound_enabled BOOLEAN DEFAULT TRUE,
     theme TEXT DEFAULT 'german',
     custom_color TEXT DEFAULT NULL,
+    speedrun_enabled BOOLEAN DEFAULT FALSE,
+    strict_articles BOOLEAN DEFAULT FALSE,
+    show_examples BOOLEAN DEFAULT TRUE,
+    plurals BOOLEAN DEFAULT FALSE,
+    force_umlauts BOOLEAN DEFAULT FALSE,
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
 );
 
@@ -27,10 +61,24 @@ CREATE TABLE IF NOT EXISTS failed_words (
     user_id INTEGER NOT NULL,
     category TEXT NOT NULL,
     word TEXT NOT NULL,
+    english TEXT,
+    gender TEXT,
+    plural TEXT,
     failures INTEGER DEFAULT 1,
+    ease REAL NOT NULL DEFAULT 2.5,             -- SM-2 spaced repetition (srs.py)
+    interval_days INTEGER NOT NULL DEFAULT 0,
+    repetitions INTEGER NOT NULL DEFAULT 0,
+    due_at TIMESTAMP,
     FOREIGN KEY(user_id) REFERENCES users(id) ON DELETE CASCADE
 );
 
+-- One row per (user, word) so failures can be upserted
+CREATE UNIQUE INDEX IF NOT EXISTS failed_words_user_word ON failed_words (user_id, word);
+
+-- Review queue: the words that are due next
+CREATE INDEX IF NOT EXISTS failed_words_user_due ON failed_words (user_id, due_at);
+
+-- Every perfect run (no longer written, kept for history)
 CREATE TABLE IF NOT EXISTS leaderboard (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     user_id INTEGER,
@@ -41,3 +89,20 @@ CREATE TABLE IF NOT EXISTS leaderboard (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY(user_id) REFERENCES users(id) ON DELETE CASCADE
 );
+
+CREATE INDEX IF NOT EXISTS leaderboard_category_score_time ON leaderboard (category, score, time);
+
+-- One row per (user, category) holding that user's fastest perfect run
+CREATE TABLE IF NOT EXISTS leaderboard_best (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    username TEXT NOT NULL,
+    category TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    time REAL NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY(user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS leaderboard_best_user_category ON leaderboard_best (user_id, category);
+CREATE INDEX IF NOT EXISTS leaderboard_best_category_time ON leaderboard_best (category, time);
@@ -0,0 +1,156 @@
+import threading, time, sqlite3
+
+# Small connection pool shared by PostgreSQL (production) and SQLite (local dev).
+# Connections are created lazily up to max_size, checked before being handed out
+# and returned to the pool at the end of every request instead of being closed.
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    def __init__(self, connect, min_size=1, max_size=10, timeout=5.0,
+                 health_check_interval=30.0, max_idle=300.0):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("invalid pool size")
+
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self.max_idle = max_idle
+
+        self._cond = threading.Condition()
+        self._idle = []          # list of (connection, last_used, last_checked)
+        self._size = 0           # idle + checked out connections
+
+        self._stats = {
+            "checkouts": 0,
+            "created": 0,
+            "discarded": 0,
+            "timeouts": 0,
+            "waits": 0,
+        }
+
+        for _ in range(min_size):
+            now = time.monotonic()
+            self._idle.append((connect(), now, now))
+            self._size += 1
+            self._stats["created"] += 1
+
+    def _discard(self, conn):
+        self._size -= 1
+        self._stats["discarded"] += 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _is_healthy(self, conn):
+        if getattr(conn, "closed", 0):
+            return False
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT 1")
+            cur.fetchall()
+            cur.close()
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def getconn(self):
+        deadline = time.monotonic() + self.timeout
+
+        with self._cond:
+            while True:
+                # Reuse an idle connection if one is available
+                while self._idle:
+                    conn, last_used, last_checked = self._idle.pop()
+                    now = time.monotonic()
+
+                    # Shrink back towards min_size when connections sit unused
+                    if now - last_used > self.max_idle and self._size > self.min_size:
+                        self._discard(conn)
+                        continue
+
+                    # Only ping connections that haven't been checked recently
+                    if now - last_checked > self.health_check_interval and not self._is_healthy(conn):
+                        self._discard(conn)
+                        continue
+
+                    self._stats["checkouts"] += 1
+                    return conn
+
+                # Reserve a slot for a new connection if we are below max_size
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+
+                # Otherwise wait for a connection to be returned
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    raise PoolTimeout(f"no database connection available after {self.timeout}s")
+
+                self._stats["waits"] += 1
+                self._cond.wait(remaining)
+
+        # Connect outside the lock so a slow handshake doesn't block other threads
+        try:
+            conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+        with self._cond:
+            self._stats["created"] += 1
+            self._stats["checkouts"] += 1
+        return conn
+
+    def putconn(self, conn, broken=False):
+        with self._cond:
+            if not broken:
+                # Never hand out a connection with an open transaction
+                try:
+                    conn.rollback()
+                except Exception:
+                    broken = True
+
+            if broken or getattr(conn, "closed", 0):
+                self._discard(conn)
+            else:
+                now = time.monotonic()
+                self._idle.append((conn, now, now))
+
+            self._cond.notify()
+
+    def closeall(self):
+        with self._cond:
+            while self._idle:
+                conn, _, _ = self._idle.pop()
+                self._discard(conn)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                **self._stats,
+            }
+
+
+def sqlite_connect(path):
+    def connect():
+        conn = sqlite3.connect(path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys = ON")
+        return conn
+    return connect
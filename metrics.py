@@ -0,0 +1,123 @@
+import re, threading
+from functools import lru_cache
+
+# Request and query metrics in Prometheus text format (served at /metrics).
+# Like the caches, every gunicorn worker keeps its own numbers; Prometheus
+# adds them up when the workers are scraped separately, otherwise each scrape
+# shows the worker that answered it.
+
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)   # last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+
+    def lines(self, name, labels):
+        out = []
+        total = 0
+        for bound, count in zip(self.buckets + ("+Inf",), self.counts):
+            total += count
+            out.append(f'{name}_bucket{{{labels},le="{bound}"}} {total}')
+        out.append(f"{name}_sum{{{labels}}} {self.sum}")
+        out.append(f"{name}_count{{{labels}}} {self.count}")
+        return out
+
+
+@lru_cache(maxsize=512)
+def query_label(sql):
+    # Short, low-cardinality label for an ad-hoc query:
+    # whitespace collapsed, multi-row VALUES and IN (...) lists folded
+    sql = " ".join(sql.split())
+    sql = re.sub(r"\((?:\s*(?:%s|CURRENT_TIMESTAMP)\s*,?)+\)(?:\s*,\s*\((?:\s*(?:%s|CURRENT_TIMESTAMP)\s*,?)+\))*", "(...)", sql)
+    return sql[:120]
+
+
+def escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = {}        # (method, route, status) -> count
+        self.latency = {}         # (method, route) -> Histogram
+        self.request_queries = {} # route -> Histogram of queries per request
+        self.queries = {}         # query label -> Histogram
+        self.slow_queries = 0
+
+    def observe_request(self, method, route, status, seconds, queries):
+        with self._lock:
+            key = (method, route, status)
+            self.requests[key] = self.requests.get(key, 0) + 1
+
+            hist = self.latency.get((method, route))
+            if hist is None:
+                hist = self.latency[(method, route)] = Histogram(REQUEST_BUCKETS)
+            hist.observe(seconds)
+
+            hist = self.request_queries.get(route)
+            if hist is None:
+                hist = self.request_queries[route] = Histogram(QUERY_COUNT_BUCKETS)
+            hist.observe(queries)
+
+    def observe_query(self, label, seconds, slow=False):
+        with self._lock:
+            hist = self.queries.get(label)
+            if hist is None:
+                hist = self.queries[label] = Histogram(QUERY_BUCKETS)
+            hist.observe(seconds)
+            if slow:
+                self.slow_queries += 1
+
+    def render(self, gauges=None):
+        # gauges: {metric name: (help text, {labels string: value})}
+        lines = []
+
+        with self._lock:
+            lines.append("# HELP http_requests_total Requests by route and status.")
+            lines.append("# TYPE http_requests_total counter")
+            for (method, route, status), count in sorted(self.requests.items()):
+                lines.append(f'http_requests_total{{method="{method}",route="{escape(route)}",status="{status}"}} {count}')
+
+            lines.append("# HELP http_request_duration_seconds Request latency by route.")
+            lines.append("# TYPE http_request_duration_seconds histogram")
+            for (method, route), hist in sorted(self.latency.items()):
+                lines.extend(hist.lines("http_request_duration_seconds", f'method="{method}",route="{escape(route)}"'))
+
+            lines.append("# HELP http_request_db_queries Database queries per request by route.")
+            lines.append("# TYPE http_request_db_queries histogram")
+            for route, hist in sorted(self.request_queries.items()):
+                lines.extend(hist.lines("http_request_db_queries", f'route="{escape(route)}"'))
+
+            lines.append("# HELP db_query_duration_seconds Query time by named query or SQL.")
+            lines.append("# TYPE db_query_duration_seconds histogram")
+            for label, hist in sorted(self.queries.items()):
+                lines.extend(hist.lines("db_query_duration_seconds", f'query="{escape(label)}"'))
+
+            lines.append("# HELP db_slow_queries_total Queries slower than SLOW_QUERY_MS.")
+            lines.append("# TYPE db_slow_queries_total counter")
+            lines.append(f"db_slow_queries_total {self.slow_queries}")
+
+        for name, (help_text, values) in (gauges or {}).items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            for labels, value in values.items():
+                lines.append(f"{name}{{{labels}}} {value}" if labels else f"{name} {value}")
+
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,286 @@
+import sqlite3
+
+from srs import utcnow
+
+# Versioned schema migrations for SQLite (local) and PostgreSQL (production).
+# Applied versions are recorded in schema_migrations, so running the migrations
+# again only applies the new steps. Run them on deploy with:
+#
+#     flask --app app migrate
+#
+# Every step is a list of SQL statements or a function(db, dialect). {pk} and
+# {float} are replaced with the column types of the current database.
+
+TYPES = {
+    "sqlite": {"pk": "INTEGER PRIMARY KEY AUTOINCREMENT", "float": "REAL"},
+    "postgres": {"pk": "SERIAL PRIMARY KEY", "float": "DOUBLE PRECISION"},
+}
+
+
+def run(db, dialect, query, params=()):
+    cur = db.cursor()
+    if dialect == "sqlite":
+        query = query.replace("%s", "?")
+    cur.execute(query.format(**TYPES[dialect]), params)
+    return cur
+
+
+def table_columns(db, dialect, table):
+    if dialect == "sqlite":
+        return {row[1] for row in db.execute(f"PRAGMA table_info({table})").fetchall()}
+
+    cur = run(db, dialect,
+        "SELECT column_name FROM information_schema.columns WHERE table_name = %s",
+        (table,)
+    )
+    return {row["column_name"] if isinstance(row, dict) else row[0] for row in cur.fetchall()}
+
+
+def add_columns(table, columns):
+    def step(db, dialect):
+        existing = table_columns(db, dialect, table)
+        for name, definition in columns:
+            if name not in existing:
+                run(db, dialect, f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+    return step
+
+
+def due_now(db, dialect):
+    # Failed words without a due time are due right away (naive UTC, see srs.py)
+    run(db, dialect, "UPDATE failed_words SET due_at = %s WHERE due_at IS NULL", (utcnow(),))
+
+
+MIGRATIONS = [
+    (1, "create tables", [
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            id {pk},
+            username TEXT NOT NULL UNIQUE,
+            hash TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS scores (
+            id {pk},
+            user_id INTEGER NOT NULL REFERENCES users(id),
+            category TEXT NOT NULL,
+            best_time {float},
+            best_score INTEGER
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS user_settings (
+            user_id INTEGER PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+            sound_enabled BOOLEAN DEFAULT TRUE,
+            theme TEXT DEFAULT 'german',
+            custom_color TEXT DEFAULT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS failed_words (
+            id {pk},
+            user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+            category TEXT NOT NULL,
+            word TEXT NOT NULL,
+            failures INTEGER DEFAULT 1
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS leaderboard (
+            id {pk},
+            user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
+            username TEXT NOT NULL,
+            category TEXT NOT NULL,
+            score INTEGER NOT NULL,
+            time {float} NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+    ]),
+
+    (2, "add columns used by app.py", [
+        add_columns("users", [
+            ("xp", "INTEGER NOT NULL DEFAULT 0"),
+            ("level", "INTEGER NOT NULL DEFAULT 1"),
+            ("next_level_xp", "INTEGER NOT NULL DEFAULT 120"),
+            ("streak", "INTEGER NOT NULL DEFAULT 0"),
+            ("last_active", "DATE"),
+            ("bio", "TEXT"),
+            ("avatar", "TEXT"),
+            ("country", "TEXT"),
+        ]),
+        add_columns("user_settings", [
+            ("speedrun_enabled", "BOOLEAN DEFAULT FALSE"),
+            ("strict_articles", "BOOLEAN DEFAULT FALSE"),
+            ("show_examples", "BOOLEAN DEFAULT TRUE"),
+            ("plurals", "BOOLEAN DEFAULT FALSE"),
+            ("force_umlauts", "BOOLEAN DEFAULT FALSE"),
+        ]),
+        add_columns("failed_words", [
+            ("english", "TEXT"),
+            ("gender", "TEXT"),
+            ("plural", "TEXT"),
+        ]),
+    ]),
+
+    (3, "best time per user and category", [
+        """
+        CREATE TABLE IF NOT EXISTS leaderboard_best (
+            id {pk},
+            user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+            username TEXT NOT NULL,
+            category TEXT NOT NULL,
+            score INTEGER NOT NULL,
+            time {float} NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        "CREATE UNIQUE INDEX IF NOT EXISTS leaderboard_best_user_category ON leaderboard_best (user_id, category)",
+        # Backfill from the old per-run table: each user's best run per category
+        """
+        INSERT INTO leaderboard_best (user_id, username, category, score, time)
+        SELECT l.user_id, u.username, l.category, l.score, l.time
+        FROM leaderboard l
+        JOIN users u ON u.id = l.user_id
+        WHERE NOT EXISTS (
+            SELECT 1 FROM leaderboard l2
+            WHERE l2.user_id = l.user_id
+            AND l2.category = l.category
+            AND (l2.score > l.score
+                 OR (l2.score = l.score AND (l2.time < l.time OR (l2.time = l.time AND l2.id < l.id))))
+        )
+        ON CONFLICT (user_id, category) DO NOTHING
+        """,
+    ]),
+
+    (4, "one failed_words row per (user, word)", [
+        # Fold duplicate rows into the newest one, then enforce uniqueness
+        """
+        UPDATE failed_words
+        SET failures = (
+            SELECT SUM(f2.failures)
+            FROM failed_words f2
+            WHERE f2.user_id = failed_words.user_id
+            AND f2.word = failed_words.word
+        )
+        WHERE id IN (
+            SELECT MAX(id) FROM failed_words
+            GROUP BY user_id, word
+            HAVING COUNT(*) > 1
+        )
+        """,
+        """
+        DELETE FROM failed_words
+        WHERE id NOT IN (
+            SELECT MAX(id) FROM failed_words
+            GROUP BY user_id, word
+        )
+        """,
+        "CREATE UNIQUE INDEX IF NOT EXISTS failed_words_user_word ON failed_words (user_id, word)",
+    ]),
+
+    (5, "one scores row per (user, category)", [
+        # Keep the best row (highest score, then fastest time, then oldest)
+        """
+        DELETE FROM scores
+        WHERE EXISTS (
+            SELECT 1 FROM scores s2
+            WHERE s2.user_id = scores.user_id
+            AND s2.category = scores.category
+            AND s2.id != scores.id
+            AND (
+                COALESCE(s2.best_score, -1) > COALESCE(scores.best_score, -1)
+                OR (COALESCE(s2.best_score, -1) = COALESCE(scores.best_score, -1)
+                    AND (COALESCE(s2.best_time, 1e9) < COALESCE(scores.best_time, 1e9)
+                         OR (COALESCE(s2.best_time, 1e9) = COALESCE(scores.best_time, 1e9) AND s2.id < scores.id)))
+            )
+        )
+        """,
+        "CREATE UNIQUE INDEX IF NOT EXISTS scores_user_category ON scores (user_id, category)",
+    ]),
+
+    (6, "indexes for the hot queries", [
+        "CREATE INDEX IF NOT EXISTS leaderboard_best_category_time ON leaderboard_best (category, time)",
+        "CREATE INDEX IF NOT EXISTS leaderboard_category_score_time ON leaderboard (category, score, time)",
+        "CREATE INDEX IF NOT EXISTS users_ranking ON users (level DESC, xp DESC, streak DESC, created_at)",
+    ]),
+
+    (7, "spaced repetition for failed words", [
+        add_columns("failed_words", [
+            ("ease", "{float} NOT NULL DEFAULT 2.5"),
+            ("interval_days", "INTEGER NOT NULL DEFAULT 0"),
+            ("repetitions", "INTEGER NOT NULL DEFAULT 0"),
+            ("due_at", "TIMESTAMP"),
+        ]),
+        # Everything missed so far is due right away
+        due_now,
+        "CREATE INDEX IF NOT EXISTS failed_words_user_due ON failed_words (user_id, due_at)",
+    ]),
+
+    (8, "when a user's ranking last changed", [
+        add_columns("users", [
+            ("ranking_changed_at", "TIMESTAMP"),
+        ]),
+        "CREATE INDEX IF NOT EXISTS users_ranking_changed ON users (ranking_changed_at)",
+    ]),
+
+    (9, "deleted users", [
+        # Tombstones, so in-memory rankings drop accounts deleted by other workers
+        """
+        CREATE TABLE IF NOT EXISTS deleted_users (
+            user_id INTEGER NOT NULL,
+            deleted_at TIMESTAMP NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS deleted_users_deleted_at ON deleted_users (deleted_at)",
+    ]),
+]
+
+
+def applied_versions(db, dialect):
+    run(db, dialect, """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    db.commit()
+
+    rows = run(db, dialect, "SELECT version FROM schema_migrations").fetchall()
+    return {row["version"] if isinstance(row, dict) else row[0] for row in rows}
+
+
+def migrate(db, dialect, log=print):
+    done = applied_versions(db, dialect)
+    applied = []
+
+    for version, name, steps in MIGRATIONS:
+        if version in done:
+            continue
+
+        # One transaction per version (DDL is transactional on both databases)
+        if isinstance(db, sqlite3.Connection):
+            db.execute("BEGIN")
+
+        try:
+            for step in steps:
+                if callable(step):
+                    step(db, dialect)
+                else:
+                    run(db, dialect, step)
+
+            run(db, dialect,
+                "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                (version, name)
+            )
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+        log(f"Applied migration {version}: {name}")
+        applied.append(version)
+
+    return applied
@@ -0,0 +1,263 @@
+import re
+from functools import lru_cache
+
+import psycopg2.errors
+import psycopg2.extensions
+import psycopg2.extras
+
+# Named queries used by the hot routes. They are written once with "%s"
+# placeholders (or as {dialect: sql} when the databases need different SQL)
+# and compiled once per dialect:
+#   sqlite   -> "?" placeholders
+#   postgres -> "%s" for psycopg2, or a server-side prepared statement ($1, $2, ...)
+#   numeric  -> "$1, $2, ..." (PREPARE and asyncpg)
+
+QUERIES = {
+    "progress_scores": """
+        SELECT category, best_score
+        FROM scores
+        WHERE user_id = %s
+    """,
+
+    # Columns are listed so the prepared statement keeps its result type when
+    # a migration adds a column to user_settings
+    "user_settings": """
+        SELECT user_id, sound_enabled, theme, custom_color, speedrun_enabled,
+            strict_articles, show_examples, plurals, force_umlauts
+        FROM user_settings
+        WHERE user_id = %s
+    """,
+
+    # due_at is naive UTC (srs.utcnow()) and "now" is passed in, because
+    # CURRENT_TIMESTAMP is in the session's time zone on PostgreSQL.
+    # Params: now, user_id
+    "failed_words_count": """
+        SELECT COUNT(*) AS c,
+            COALESCE(SUM(CASE WHEN due_at <= %s THEN 1 ELSE 0 END), 0) AS due
+        FROM failed_words
+        WHERE user_id = %s
+    """,
+
+    # Next words to review, oldest due first (index on user_id, due_at)
+    # Params: user_id, now, limit
+    "due_failed_words": """
+        SELECT word, english, gender, plural, category
+        FROM failed_words
+        WHERE user_id = %s
+        AND due_at <= %s
+        ORDER BY due_at
+        LIMIT %s
+    """,
+
+    "save_best_score": """
+        INSERT INTO scores (user_id, category, best_score, best_time)
+        VALUES (%s, %s, %s, %s)
+        ON CONFLICT (user_id, category)
+        DO UPDATE SET
+            best_score = EXCLUDED.best_score,
+            best_time = EXCLUDED.best_time
+        WHERE EXCLUDED.best_score > scores.best_score
+        OR (EXCLUDED.best_score = scores.best_score AND EXCLUDED.best_time < scores.best_time)
+        RETURNING id
+    """,
+
+    # Streak: same day keeps it, yesterday continues it, anything else resets to 1.
+    # XP and level-ups: "levels" walks the curve one level at a time, exactly like
+    # the old Python loop (next_level_xp * 5 / 4 is integer division, i.e.
+    # int(next_level_xp * 1.25)), and "reached" is where it stops. The curve
+    # truncates at every step, so there is no closed form, but a quiz is rarely
+    # worth more than one or two levels.
+    # ranking_changed_at lets other workers' in-memory rankings catch up (rankings.py).
+    # Params: today, yesterday, xp_gain, now, user_id
+    "award_xp": """
+        WITH RECURSIVE levels (xp, level, next_level_xp) AS (
+            SELECT xp + %(xp_gain)s, level, next_level_xp
+            FROM users
+            WHERE id = %(user_id)s
+            UNION ALL
+            SELECT xp - next_level_xp, level + 1, next_level_xp * 5 / 4
+            FROM levels
+            WHERE xp >= next_level_xp
+        ),
+        reached AS (
+            SELECT xp, level, next_level_xp FROM levels WHERE xp < next_level_xp
+        )
+        UPDATE users
+        SET streak = CASE
+                WHEN last_active = %(today)s THEN streak
+                WHEN last_active = %(yesterday)s THEN streak + 1
+                ELSE 1
+            END,
+            last_active = %(today)s,
+            xp = (SELECT xp FROM reached),
+            level = (SELECT level FROM reached),
+            next_level_xp = (SELECT next_level_xp FROM reached),
+            ranking_changed_at = %(now)s
+        WHERE id = %(user_id)s
+        RETURNING id, username, xp, level, next_level_xp, streak, country, created_at
+    """,
+
+    "save_leaderboard_best": """
+        INSERT INTO leaderboard_best (user_id, username, category, score, time)
+        VALUES (%s, %s, %s, %s, %s)
+        ON CONFLICT (user_id, category)
+        DO UPDATE SET
+            username = EXCLUDED.username,
+            score = EXCLUDED.score,
+            time = EXCLUDED.time,
+            created_at = CURRENT_TIMESTAMP
+        WHERE EXCLUDED.time < leaderboard_best.time
+        OR EXCLUDED.score != leaderboard_best.score
+    """,
+
+    "leaderboard_top": """
+        SELECT username, time
+        FROM leaderboard_best
+        WHERE category = %s
+        AND score = %s
+        ORDER BY time ASC
+        LIMIT %s
+    """,
+
+    # Only used when the ranking store is unavailable: users sorted ahead of
+    # this one (level DESC, xp DESC, streak DESC, created_at ASC, id ASC), plus one
+    "user_rank": """
+        SELECT COUNT(*) + 1 AS rank
+        FROM users u, users o
+        WHERE u.id = %s
+        AND (o.level > u.level
+            OR (o.level = u.level AND o.xp > u.xp)
+            OR (o.level = u.level AND o.xp = u.xp AND o.streak > u.streak)
+            OR (o.level = u.level AND o.xp = u.xp AND o.streak = u.streak AND o.created_at < u.created_at)
+            OR (o.level = u.level AND o.xp = u.xp AND o.streak = u.streak AND o.created_at = u.created_at AND o.id < u.id))
+    """,
+}
+
+
+def _json_rows(dialect, columns, sql):
+    # Scalar subquery: the rows of `sql` as one JSON array of objects
+    if dialect == "postgres":
+        return f"(SELECT COALESCE(json_agg(t), '[]'::json) FROM ({sql}) t)"
+
+    fields = ", ".join(f"'{c}', {c}" for c in columns)
+    return f"(SELECT json_group_array(json_object({fields})) FROM ({sql}))"
+
+
+def _profile_query(dialect, where):
+    # Everything the profile pages show in one round trip: the user row and their
+    # scores and failed words as JSON arrays (psycopg2 parses them, SQLite returns
+    # text). The rank comes from the ranking store (see user_rank)
+    stats = _json_rows(dialect, ("category", "best_score", "best_time"), """
+        SELECT category, best_score, best_time
+        FROM scores
+        WHERE user_id = u.id
+        AND category != 'failed_words'
+    """)
+    failed = _json_rows(dialect, ("word", "failures", "category"), """
+        SELECT word, failures, category
+        FROM failed_words
+        WHERE user_id = u.id
+    """)
+
+    return f"""
+        SELECT u.id, u.username, u.xp, u.level, u.next_level_xp, u.streak, u.bio, u.avatar, u.country, u.created_at,
+            {stats} AS stats,
+            {failed} AS failed
+        FROM users u
+        WHERE {where}
+    """
+
+
+QUERIES["profile_by_id"] = {d: _profile_query(d, "u.id = %s") for d in ("postgres", "sqlite")}
+QUERIES["profile_by_username"] = {d: _profile_query(d, "u.username = %s") for d in ("postgres", "sqlite")}
+
+_PLACEHOLDER = re.compile(r"%\((\w+)\)s|%s")
+
+
+class PreparingConnection(psycopg2.extensions.connection):
+    # psycopg2 connection that remembers which statements it has PREPAREd, and
+    # which ones have to be dropped before they are prepared again
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = set()
+        self.stale = set()
+
+
+@lru_cache(maxsize=1024)
+def compile_sql(sql, dialect):
+    # Returns (sql, param_names). param_names is None for positional "%s" queries,
+    # otherwise the order in which named parameters have to be passed.
+    names = []
+
+    def numbered(match):
+        name = match.group(1) or str(len(names))
+        if match.group(1) and name in names:
+            return f"${names.index(name) + 1}"
+        names.append(name)
+        return f"${len(names)}"
+
+    if dialect == "numeric":
+        compiled = _PLACEHOLDER.sub(numbered, sql)
+    elif dialect == "sqlite":
+        compiled = _PLACEHOLDER.sub(lambda m: f":{m.group(1)}" if m.group(1) else "?", sql)
+        return compiled, None
+    else:
+        return sql, None
+
+    named = any(not n.isdigit() for n in names)
+    return compiled, (names if named else None)
+
+
+def query_sql(name, dialect):
+    sql = QUERIES[name]
+    if isinstance(sql, dict):
+        sql = sql["postgres" if dialect == "numeric" else dialect]
+    return sql
+
+
+def run_named(db, name, params, dialect, prepare=False):
+    cur = db.cursor()
+
+    if dialect == "postgres" and prepare:
+        sql, names = compile_sql(query_sql(name, dialect), "numeric")
+        stmt = f"q_{name}"
+
+        if stmt not in db.prepared:
+            if stmt in db.stale:
+                cur.execute(f"DEALLOCATE {stmt}")
+                db.stale.discard(stmt)
+            cur.execute(f"PREPARE {stmt} AS {sql}")
+            db.prepared.add(stmt)
+
+        if names is not None:
+            params = [params[n] for n in names]
+
+        try:
+            if params:
+                cur.execute(f"EXECUTE {stmt} ({', '.join(['%s'] * len(params))})", params)
+            else:
+                cur.execute(f"EXECUTE {stmt}")
+        except psycopg2.errors.FeatureNotSupported:
+            # "cached plan must not change result type": a migration changed a
+            # column this statement returns. The transaction is aborted now, so
+            # the statement is dropped and prepared again the next time it runs.
+            db.prepared.discard(stmt)
+            db.stale.add(stmt)
+            raise
+        return cur
+
+    sql, _ = compile_sql(query_sql(name, dialect), dialect)
+    cur.execute(sql, params)
+    return cur
+
+
+def run_batch(db, sql, params_seq, dialect, page_size=100):
+    cur = db.cursor()
+    compiled, _ = compile_sql(sql, dialect)
+
+    if dialect == "sqlite":
+        cur.executemany(compiled, params_seq)
+    else:
+        # Sends page_size statements per round trip
+        psycopg2.extras.execute_batch(cur, compiled, params_seq, page_size=page_size)
+    return cur
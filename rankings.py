@@ -0,0 +1,287 @@
+import bisect, calendar, json, threading, time
+from datetime import datetime, timedelta, timezone
+
+# Materialized global ranking (level DESC, xp DESC, streak DESC, created_at ASC).
+# Every user gets a fixed-width string key that sorts in ranking order, so the
+# ranking can live in a sorted list (in-process) or a Redis sorted set where all
+# members share score 0 and are ordered lexicographically.
+
+PAYLOAD_FIELDS = ("username", "level", "xp", "streak", "country")
+
+
+def _timestamp(value):
+    if value is None:
+        return 0
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    tt = value.utctimetuple() if value.tzinfo else value.timetuple()
+    return calendar.timegm(tt) * 1000000 + value.microsecond
+
+
+def ranking_key(user):
+    level = min(max(int(user["level"] or 0), 0), 999999)
+    xp = min(max(int(user["xp"] or 0), 0), 9999999999)
+    streak = min(max(int(user["streak"] or 0), 0), 999999)
+
+    return "%06d%010d%06d%017d:%010d" % (
+        999999 - level,
+        9999999999 - xp,
+        999999 - streak,
+        _timestamp(user["created_at"]),
+        user["id"]
+    )
+
+
+def _utcnow():
+    # Naive UTC, like ranking_changed_at
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _payload(user):
+    return {field: user[field] for field in PAYLOAD_FIELDS}
+
+
+class MemoryRanking:
+    # Per-process fallback. Loaded from the database once; after that this worker's
+    # own changes are applied as they happen, and other workers' changes are read
+    # every refresh_interval seconds: only the users changed since the last check
+    # (users.ranking_changed_at) and the accounts deleted since then (deleted_users).
+
+    # Changes are re-read from a little before the last check, for transactions
+    # that committed after it
+    CATCH_UP_MARGIN = timedelta(seconds=10)
+
+    def __init__(self, refresh_interval=60):
+        self.refresh_interval = refresh_interval
+        self._lock = threading.RLock()
+        self._keys = []          # sorted ranking keys
+        self._users = {}         # user_id -> (key, payload)
+        self._loaded_at = None   # time.monotonic() of the last load / catch-up
+        self._synced_at = None   # UTC time the last load / catch-up started
+
+    def ensure_loaded(self, loader, changes=None):
+        # loader(): every user; changes(since): (users changed since then, ids deleted since then)
+        with self._lock:
+            if self._loaded_at is None:
+                self._load(loader)
+                return
+
+            if changes is None or time.monotonic() - self._loaded_at < self.refresh_interval:
+                return
+
+            started = _utcnow()
+            users, deleted = changes(self._synced_at - self.CATCH_UP_MARGIN)
+
+            for user in users:
+                self._set(user)
+            for user_id in deleted:
+                self._remove(user_id)
+
+            self._loaded_at = time.monotonic()
+            self._synced_at = started
+
+    def _load(self, loader):
+        started = _utcnow()
+
+        users = {}
+        for user in loader():
+            users[user["id"]] = (ranking_key(user), _payload(user))
+
+        self._users = users
+        self._keys = sorted(key for key, _ in users.values())
+        self._loaded_at = time.monotonic()
+        self._synced_at = started
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+    def update(self, user):
+        with self._lock:
+            if self._loaded_at is not None:
+                self._set(user)
+
+    def _set(self, user):
+        self._remove(user["id"])
+
+        key = ranking_key(user)
+        bisect.insort(self._keys, key)
+        self._users[user["id"]] = (key, _payload(user))
+
+    def remove(self, user_id):
+        with self._lock:
+            self._remove(user_id)
+
+    def _remove(self, user_id):
+        old = self._users.pop(user_id, None)
+        if old:
+            i = bisect.bisect_left(self._keys, old[0])
+            if i < len(self._keys) and self._keys[i] == old[0]:
+                del self._keys[i]
+
+    def rank(self, user_id):
+        with self._lock:
+            entry = self._users.get(user_id)
+            if not entry:
+                return None
+            return bisect.bisect_left(self._keys, entry[0]) + 1
+
+    def count(self):
+        return len(self._keys)
+
+    def page(self, offset, limit):
+        with self._lock:
+            rows = []
+            for i, key in enumerate(self._keys[offset:offset + limit]):
+                user_id = int(key.rsplit(":", 1)[1])
+                rows.append({"rank": offset + i + 1, **self._users[user_id][1]})
+            return rows
+
+
+class RedisRanking:
+    # Shared between all workers and updated incrementally. The full ranking is
+    # only built when it is missing (first start, Redis flushed or invalidate()):
+    # into temporary keys that are then renamed over the live ones. Updates that
+    # arrive during a build are also queued in a pending hash and replayed in the
+    # same script that renames, so none of them are lost.
+
+    _UPDATE_SCRIPT = """
+    local old = redis.call('HGET', KEYS[2], ARGV[1])
+    if old then redis.call('ZREM', KEYS[1], old) end
+    redis.call('ZADD', KEYS[1], 0, ARGV[2])
+    redis.call('HSET', KEYS[2], ARGV[1], ARGV[2])
+    redis.call('HSET', KEYS[3], ARGV[1], ARGV[3])
+    if redis.call('EXISTS', KEYS[5]) == 1 then
+        redis.call('HSET', KEYS[4], ARGV[1], ARGV[2] .. '|' .. ARGV[3])
+    end
+    """
+
+    _REMOVE_SCRIPT = """
+    local old = redis.call('HGET', KEYS[2], ARGV[1])
+    if old then redis.call('ZREM', KEYS[1], old) end
+    redis.call('HDEL', KEYS[2], ARGV[1])
+    redis.call('HDEL', KEYS[3], ARGV[1])
+    if redis.call('EXISTS', KEYS[5]) == 1 then
+        redis.call('HSET', KEYS[4], ARGV[1], '')
+    end
+    """
+
+    # KEYS: order, keys, users, tmp order, tmp keys, tmp users, pending, loaded, lock
+    _SWAP_SCRIPT = """
+    if redis.call('EXISTS', KEYS[4]) == 1 then
+        redis.call('RENAME', KEYS[4], KEYS[1])
+        redis.call('RENAME', KEYS[5], KEYS[2])
+        redis.call('RENAME', KEYS[6], KEYS[3])
+    else
+        redis.call('DEL', KEYS[1], KEYS[2], KEYS[3])
+    end
+
+    local pending = redis.call('HGETALL', KEYS[7])
+    for i = 1, #pending, 2 do
+        local id, value = pending[i], pending[i + 1]
+        local old = redis.call('HGET', KEYS[2], id)
+        if old then redis.call('ZREM', KEYS[1], old) end
+
+        if value == '' then
+            redis.call('HDEL', KEYS[2], id)
+            redis.call('HDEL', KEYS[3], id)
+        else
+            local sep = string.find(value, '|', 1, true)
+            local key = string.sub(value, 1, sep - 1)
+            redis.call('ZADD', KEYS[1], 0, key)
+            redis.call('HSET', KEYS[2], id, key)
+            redis.call('HSET', KEYS[3], id, string.sub(value, sep + 1))
+        end
+    end
+
+    redis.call('DEL', KEYS[7], KEYS[9])
+    redis.call('SET', KEYS[8], '1')
+    """
+
+    def __init__(self, client, prefix="rankings"):
+        self.redis = client
+        self.order_key = f"{prefix}:order"
+        self.keys_key = f"{prefix}:keys"
+        self.users_key = f"{prefix}:users"
+        self.pending_key = f"{prefix}:pending"
+        self.loaded_key = f"{prefix}:loaded"
+        self.lock_key = f"{prefix}:lock"
+        self._update = client.register_script(self._UPDATE_SCRIPT)
+        self._remove = client.register_script(self._REMOVE_SCRIPT)
+        self._swap = client.register_script(self._SWAP_SCRIPT)
+
+    def _live_keys(self):
+        return [self.order_key, self.keys_key, self.users_key, self.pending_key, self.lock_key]
+
+    def ensure_loaded(self, loader, changes=None):
+        # changes is only used by MemoryRanking: updates go straight to Redis
+        if self.redis.exists(self.loaded_key):
+            return
+
+        # Only one worker builds; the others keep serving the old copy. From here
+        # on, updates are also queued in the pending hash.
+        if not self.redis.set(self.lock_key, "1", nx=True, ex=300):
+            return
+        self.redis.delete(self.pending_key)
+
+        try:
+            order, keys, users = {}, {}, {}
+            for user in loader():
+                key = ranking_key(user)
+                order[key] = 0
+                keys[user["id"]] = key
+                users[user["id"]] = json.dumps(_payload(user))
+
+            tmp = [f"{self.order_key}:tmp", f"{self.keys_key}:tmp", f"{self.users_key}:tmp"]
+            pipe = self.redis.pipeline()
+            pipe.delete(*tmp)
+            if order:
+                pipe.zadd(tmp[0], order)
+                pipe.hset(tmp[1], mapping=keys)
+                pipe.hset(tmp[2], mapping=users)
+            pipe.execute()
+
+            self._swap(keys=[
+                self.order_key, self.keys_key, self.users_key, *tmp,
+                self.pending_key, self.loaded_key, self.lock_key
+            ])
+        finally:
+            self.redis.delete(self.lock_key)
+
+    def invalidate(self):
+        self.redis.delete(self.loaded_key)
+
+    def update(self, user):
+        self._update(
+            keys=self._live_keys(),
+            args=[user["id"], ranking_key(user), json.dumps(_payload(user))]
+        )
+
+    def remove(self, user_id):
+        self._remove(keys=self._live_keys(), args=[user_id])
+
+    def rank(self, user_id):
+        key = self.redis.hget(self.keys_key, user_id)
+        if key is None:
+            return None
+        rank = self.redis.zrank(self.order_key, key)
+        return None if rank is None else rank + 1
+
+    def count(self):
+        return self.redis.zcard(self.order_key)
+
+    def page(self, offset, limit):
+        members = self.redis.zrange(self.order_key, offset, offset + limit - 1)
+        if not members:
+            return []
+
+        # client is created with decode_responses=True, so members are str
+        ids = [int(m.rsplit(":", 1)[1]) for m in members]
+        payloads = self.redis.hmget(self.users_key, ids)
+
+        rows = []
+        for i, payload in enumerate(payloads):
+            if payload is None:
+                continue
+            rows.append({"rank": offset + i + 1, **json.loads(payload)})
+        return rows
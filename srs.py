@@ -0,0 +1,43 @@
+from datetime import datetime, timedelta, timezone
+
+# Spaced repetition for the failed-words review (SM-2).
+# Every failed_words row has an ease factor, the current interval in days,
+# the number of correct reviews in a row and the time it is due again.
+# The quiz only knows right/wrong, so answers are graded as 4 (correct) or 1 (wrong).
+
+DEFAULT_EASE = 2.5
+MIN_EASE = 1.3
+
+GRADE_CORRECT = 4
+GRADE_WRONG = 1
+
+
+def utcnow():
+    # Naive UTC. due_at is always written and compared with this, never with
+    # CURRENT_TIMESTAMP, which is in the session's time zone on PostgreSQL.
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def schedule(ease, interval_days, repetitions, correct, now=None):
+    # Returns (ease, interval_days, repetitions, due_at) after one review
+    grade = GRADE_CORRECT if correct else GRADE_WRONG
+    ease = ease or DEFAULT_EASE
+    interval_days = interval_days or 0
+    repetitions = repetitions or 0
+
+    if grade >= 3:
+        if repetitions == 0:
+            interval_days = 1
+        elif repetitions == 1:
+            interval_days = 6
+        else:
+            interval_days = round(interval_days * ease)
+        repetitions += 1
+    else:
+        # Start over, but see it again tomorrow rather than in the same session
+        repetitions = 0
+        interval_days = 1
+
+    ease = max(MIN_EASE, ease + 0.1 - (5 - grade) * (0.08 + (5 - grade) * 0.02))
+
+    return ease, interval_days, repetitions, (now or utcnow()) + timedelta(days=interval_days)
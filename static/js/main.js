@@ -32,7 +32,8 @@ document.addEventListener("DOMContentLoaded", () => {
                 const card = document.getElementById("failed-words-card");
                 if (!card) return;
 
-                if (data.count === 0) {
+                // Only clickable when some missed words are due for review
+                if (!data.due) {
                     card.dataset.disabled = "true";
                     card.classList.add("opacity-40", "cursor-not-allowed");
                     card.classList.remove("hover:scale-[1.05]", "hover:shadow-xl");
@@ -55,7 +56,7 @@ document.addEventListener("DOMContentLoaded", () => {
 
             // Special case: Failed Words mode
             if (category === "failed_words") {
-                const response = await fetch("/api/failed_words");
+                const response = await fetch("/api/failed_words?limit=20");
                 const failed = await response.json();
 
                 const words = failed.map(item => ({
@@ -80,7 +81,8 @@ document.addEventListener("DOMContentLoaded", () => {
             // NORMAL CATEGORY
             const level = card.dataset.level;
 
-            const response = await fetch(`/static/data/${level}/${category}.json`);
+            const dataFile = `${level}/${category}.json`;
+            const response = await fetch(window.dataAssets?.[dataFile] || `/static/data/${dataFile}`);
             if (!response.ok) {
                 console.error("JSON file missing:", level, category);
                 return;
@@ -350,6 +352,9 @@ window.addEventListener("load", () => {
 
 function returnHome() {
 
+    // Save failures from an unfinished quiz
+    flushFailures();
+
     // Only clear the dynamic quiz question area
     const quizContent = document.getElementById("quiz-content");
     if (quizContent) quizContent.innerHTML = "";
@@ -380,6 +385,44 @@ function returnHome() {
 
 let activeTimers = [];
 
+// Wrong answers are collected here and sent to the backend in one request
+let pendingFailures = [];
+
+// Answers in Failed Words mode (reschedule each word's next review)
+let pendingReviews = [];
+
+function flushFailures() {
+    const requests = [];
+
+    if (pendingFailures.length > 0) {
+        const failures = pendingFailures;
+        pendingFailures = [];
+        requests.push(postBatch("/save_failures", { failures: failures }));
+    }
+
+    if (pendingReviews.length > 0) {
+        const reviews = pendingReviews;
+        pendingReviews = [];
+        requests.push(postBatch("/save_reviews", { reviews: reviews }));
+    }
+
+    return Promise.all(requests);
+}
+
+function postBatch(url, payload) {
+    return fetch(url, {
+        method: "POST",
+        keepalive: true,  // still delivered if the page is being closed
+        headers: {
+            "Content-Type": "application/json",
+            "X-CSRFToken": csrfToken
+        },
+        body: JSON.stringify(payload)
+    });
+}
+
+window.addEventListener("pagehide", flushFailures);
+
 function clearAllQuizTimers() {
     for (const timer of activeTimers) clearInterval(timer);
     activeTimers = [];
@@ -501,6 +544,7 @@ function startQuiz(words, category) {
 
     let index = 0;
     let score = 0;
+    let answers = [];  // sent with the score so the server can check it
     let startTime = Date.now();
     let timerInterval = setInterval(updateTimer, 100);
     activeTimers.push(timerInterval);
@@ -603,6 +647,12 @@ function startQuiz(words, category) {
 
         answer.disabled = true;
 
+        answers.push({
+            word: words[index].german,
+            category: words[index].category || category,
+            answer: answer.value
+        });
+
         let userInput = answer.value.trim().toLowerCase();
 
         // Choose correct answer depending on mode
@@ -730,21 +780,21 @@ function startQuiz(words, category) {
 
             answer.value = correctList[0];
 
-            // Save failed word to backend
-            fetch("/save_failure", {
-                method: "POST",
-                headers: {
-                    "Content-Type": "application/json",
-                    "X-CSRFToken": csrfToken
-                },
-                body: JSON.stringify({
+            // Queue failed word, saved in one batch when the quiz ends
+            if (category !== "failed_words") {
+                pendingFailures.push({
                     category: category,
                     word: words[index].german,
                     english: words[index].english,
                     gender: words[index].gender || null,
                     plural: words[index].plural || null
-                })
-            });
+                });
+            }
+        }
+
+        // Failed Words mode: every answer moves the word's next review
+        if (category === "failed_words") {
+            pendingReviews.push({ word: words[index].german, correct: isCorrect });
         }
 
         index++;
@@ -803,6 +853,9 @@ async function showResults() {
     let minutes = Math.floor(totalTime / 60);
     let seconds = (totalTime % 60).toFixed(2);
 
+    // Save failed words
+    await flushFailures();
+
     // Save the score
     await fetch("/save_score", {
         method: "POST",
@@ -813,7 +866,9 @@ async function showResults() {
         body: JSON.stringify({
             category: category,
             score: score,
-            time: totalTime
+            time: totalTime,
+            mode: quizMode,
+            answers: answers
         })
     });
 
@@ -836,7 +891,9 @@ async function showResults() {
         body: JSON.stringify({
             category: category,
             score: score,
-            time: totalTime
+            time: totalTime,
+            mode: quizMode,
+            answers: answers
         })
     });
 
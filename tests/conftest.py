@@ -0,0 +1,78 @@
+import itertools, os, sys, tempfile
+from datetime import datetime
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# app.py loads static/data relative to the working directory and opens its SQLite
+# database when the first request comes in, so both are set up before it's imported
+os.chdir(ROOT)
+os.environ["SQLITE_PATH"] = os.path.join(tempfile.mkdtemp(), "test.db")
+
+# The app under test always runs on SQLite; DATABASE_URL is only used by tests
+# that also check the PostgreSQL queries (skipped when it isn't set)
+POSTGRES_URL = os.environ.pop("DATABASE_URL", None)
+
+_clients = itertools.count(1)
+
+
+@pytest.fixture(scope="session")
+def app():
+    from app import app as flask_app, get_db, DB_DIALECT
+    from migrations import migrate
+
+    flask_app.config.update(TESTING=True, WTF_CSRF_ENABLED=False, SESSION_COOKIE_SECURE=False)
+
+    with flask_app.app_context():
+        migrate(get_db(), DB_DIALECT, log=lambda *args: None)
+
+    return flask_app
+
+
+@pytest.fixture
+def postgres_db():
+    # A migrated PostgreSQL connection in a throwaway schema, so tests never
+    # touch existing tables
+    if not POSTGRES_URL:
+        pytest.skip("DATABASE_URL is not set")
+
+    import psycopg2
+    from psycopg2.extras import RealDictCursor
+    from migrations import migrate
+    from queries import PreparingConnection
+
+    db = psycopg2.connect(POSTGRES_URL, connection_factory=PreparingConnection, cursor_factory=RealDictCursor)
+    schema = f"test_{datetime.now():%Y%m%d%H%M%S%f}"
+
+    cur = db.cursor()
+    cur.execute(f"CREATE SCHEMA {schema}")
+    cur.execute(f"SET search_path TO {schema}")
+    migrate(db, "postgres", log=lambda *args: None)
+
+    yield db
+
+    db.rollback()
+    db.cursor().execute(f"DROP SCHEMA {schema} CASCADE")
+    db.commit()
+    db.close()
+
+
+@pytest.fixture
+def client(app):
+    # A logged-in test client with a new user
+    # Each one gets its own address, so the per-IP limits on /register and
+    # /login don't add up over the whole suite
+    number = next(_clients)
+    client = app.test_client()
+    client.environ_base["REMOTE_ADDR"] = f"127.0.{number // 250}.{number % 250 + 1}"
+    username = f"tester{number}"
+
+    client.post("/register", data={"username": username, "password": "secret1", "confirm_password": "secret1"})
+    client.post("/login", data={"username": username, "password": "secret1"})
+
+    with client.session_transaction() as session:
+        assert "user_id" in session
+
+    return client
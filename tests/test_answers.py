@@ -0,0 +1,100 @@
+import json
+
+import pytest
+
+from answers import AnswerIndex
+from vocab import VocabStore
+
+
+@pytest.fixture(scope="module")
+def index():
+    return AnswerIndex(VocabStore("static/data").entries)
+
+
+@pytest.fixture(scope="module")
+def pronouns():
+    with open("static/data/A1/pronouns.json", encoding="utf8") as f:
+        return json.load(f)
+
+
+PRONOUNS = {("A1", "pronouns")}
+
+
+def de_to_en(words):
+    return [{"word": w["german"], "category": "pronouns", "answer": w["english"]} for w in words]
+
+
+def en_to_de(words):
+    return [{"word": w["german"], "category": "pronouns", "answer": w["german"]} for w in words]
+
+
+def test_pronouns_has_a_duplicate_word(pronouns):
+    # "sie" is both "she" and "they"; the tests below rely on that
+    germans = [w["german"] for w in pronouns]
+    assert len(set(germans)) < len(germans)
+
+
+def test_perfect_pronouns_run_scores_every_entry(index, pronouns):
+    assert index.score(de_to_en(pronouns), "de-to-en", PRONOUNS) == len(pronouns)
+    assert index.score(en_to_de(pronouns), "en-to-de", PRONOUNS) == len(pronouns)
+
+
+def test_repeated_answer_counts_once(index):
+    she = {"word": "sie", "category": "pronouns", "answer": "she"}
+    assert index.score([she, she, she], "de-to-en", PRONOUNS) == 1
+
+
+def test_wrong_answers_and_other_categories_dont_count(index, pronouns):
+    answers = de_to_en(pronouns)
+    answers[0] = dict(answers[0], answer="nope")
+
+    assert index.score(answers, "de-to-en", PRONOUNS) == len(pronouns) - 1
+    assert index.score(de_to_en(pronouns), "de-to-en", {("A1", "colors")}) == 0
+
+
+def test_save_leaderboard_accepts_perfect_pronouns_run(client, pronouns):
+    r = client.post("/save_leaderboard", json={
+        "category": "pronouns",
+        "score": len(pronouns),
+        "time": 20,
+        "mode": "de-to-en",
+        "answers": de_to_en(pronouns),
+    })
+    assert r.get_json()["status"] == "ok"
+
+    board = client.get("/api/leaderboard/pronouns").get_json()
+    assert [row["time"] for row in board] == [20]
+
+
+def test_save_score_counts_answers_on_the_server(client, pronouns):
+    r = client.post("/save_score", json={
+        "category": "pronouns",
+        "score": 999,
+        "time": 20,
+        "mode": "de-to-en",
+        "answers": de_to_en(pronouns),
+    })
+    assert r.get_json()["status"] == "ok"
+
+    progress = client.get("/api/progress").get_json()
+    assert progress["a1_pronouns"] == 100
+
+
+def test_save_score_requires_answers(client):
+    r = client.post("/save_score", json={"category": "pronouns", "score": 9, "time": 20})
+    assert r.status_code == 400
+
+
+@pytest.mark.parametrize("score, time", [
+    (None, 20), ("10", 20), (True, 20), (10, "fast"), (10, None), (10, -1), (10, float("nan")),
+])
+def test_save_leaderboard_rejects_invalid_numbers(client, pronouns, score, time):
+    r = client.post("/save_leaderboard", data=json.dumps({
+        "category": "pronouns",
+        "score": len(pronouns) if score == 10 else score,
+        "time": time,
+        "mode": "de-to-en",
+        "answers": de_to_en(pronouns),
+    }), content_type="application/json")
+    assert r.status_code == 400
+    assert r.get_json() == {"error": "invalid_data"}
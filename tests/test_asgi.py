@@ -0,0 +1,88 @@
+import asyncio
+from datetime import date, timedelta
+
+import pytest
+from limits import parse as parse_limit
+
+from conftest import POSTGRES_URL
+from srs import utcnow
+
+httpx = pytest.importorskip("httpx")
+asgi = pytest.importorskip("asgi")
+
+
+def asgi_get(path, headers=None):
+    async def get():
+        await asgi.database.open()
+        try:
+            transport = httpx.ASGITransport(app=asgi.application)
+            async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+                return await client.get(path, headers=headers or {})
+        finally:
+            await asgi.database.close()
+
+    return asyncio.run(get())
+
+
+def test_rate_limit_is_shared_by_both_modes(client, monkeypatch):
+    import app as app_module
+    monkeypatch.setattr(app_module, "API_RATE_LIMIT", parse_limit("3 per minute"))
+    cookie = {"cookie": f"session={client.get_cookie('session').value}"}
+
+    assert client.get("/api/progress").status_code == 200
+    assert asgi_get("/api/progress", cookie).status_code == 200
+    assert asgi_get("/api/progress", cookie).status_code == 200
+
+    response = asgi_get("/api/progress", cookie)
+    assert response.status_code == 429
+    assert int(response.headers["retry-after"]) >= 1
+    assert client.get("/api/progress").status_code == 429
+
+
+def test_https_redirect_on_render(app):
+    response = asgi_get("/api/leaderboard/colors?x=1", {
+        "host": "vokabelmeister.onrender.com",
+        "x-forwarded-proto": "http",
+    })
+
+    assert response.status_code == 302
+    assert response.headers["location"] == "https://vokabelmeister.onrender.com/api/leaderboard/colors?x=1"
+
+
+def test_save_score_queries_on_asyncpg(postgres_db):
+    asyncpg = pytest.importorskip("asyncpg")
+
+    cur = postgres_db.cursor()
+    cur.execute("SHOW search_path")
+    schema = cur.fetchone()["search_path"]
+    cur.execute("INSERT INTO users (username, hash, xp, next_level_xp) VALUES ('async', 'x', 25, 30) RETURNING id")
+    user_id = cur.fetchone()["id"]
+    postgres_db.commit()
+
+    today = date(2026, 3, 10)
+
+    async def save():
+        database = asgi.AsyncDatabase("postgres")
+        database.pool = await asyncpg.create_pool(POSTGRES_URL, min_size=1, max_size=2,
+                                                  server_settings={"search_path": schema})
+        try:
+            async with database.connection() as conn:
+                record = await conn.fetchone(conn.named("save_best_score"), (user_id, "A1_colors", 12, 30.5))
+                user = await conn.fetchone(conn.named("award_xp"), {
+                    "today": today,
+                    "yesterday": today - timedelta(days=1),
+                    "xp_gain": 60,
+                    "now": utcnow(),
+                    "user_id": user_id
+                })
+            async with database.connection() as conn:
+                again = await conn.fetchone(conn.named("save_best_score"), (user_id, "A1_colors", 12, 31.0))
+            return record, dict(user), again
+        finally:
+            await database.pool.close()
+
+    record, user, again = asyncio.run(save())
+
+    assert record is not None and again is None
+    # 85 XP: 30 for level 2, 37 for level 3, 18 left towards 46
+    assert (user["level"], user["xp"], user["next_level_xp"], user["streak"]) == (3, 18, 46, 1)
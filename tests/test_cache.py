@@ -0,0 +1,38 @@
+import pytest
+
+from cache import TTLCache, RedisCache
+
+
+@pytest.fixture(params=["memory", "redis"])
+def cache(request):
+    if request.param == "memory":
+        return TTLCache(maxsize=10, ttl=60)
+
+    fakeredis = pytest.importorskip("fakeredis")
+    return RedisCache(fakeredis.FakeRedis(decode_responses=True), prefix="test-cache", ttl=60)
+
+
+def test_failing_loader_leaves_no_lock_behind():
+    cache = TTLCache()
+
+    def loader():
+        raise RuntimeError("database is down")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_set("key", loader)
+
+    assert cache._flights == {}
+    assert cache.get_or_set("key", lambda: 1) == 1
+
+
+def test_tags_from_the_loaded_value(cache):
+    top = [{"username": "anna"}, {"username": "ben"}]
+    names = lambda rows: [f"name:{row['username']}" for row in rows]
+
+    cache.get_or_set("colors", lambda: top, tags=names)
+    cache.get_or_set("numbers", lambda: top[:1], tags=names)
+
+    cache.invalidate_tag("name:ben")
+
+    assert cache.get("colors") is None
+    assert cache.get("numbers") == top[:1]
@@ -0,0 +1,50 @@
+from datetime import timedelta
+
+from queries import run_named
+from srs import utcnow
+
+
+def due_count(client):
+    return client.get("/api/failed_words_count").get_json()["due"]
+
+
+def due_words(client):
+    return sorted(w["german"] for w in client.get("/api/failed_words").get_json())
+
+
+def test_review_schedule(client):
+    client.post("/save_failures", json={"failures": [
+        {"category": "colors", "word": "rot", "english": "red"},
+        {"category": "colors", "word": "blau", "english": "blue"},
+    ]})
+    assert due_count(client) == 2
+    assert due_words(client) == ["blau", "rot"]
+
+    # Answered right: not due again until tomorrow
+    client.post("/save_reviews", json={"reviews": [{"word": "rot", "correct": True}]})
+    assert due_count(client) == 1
+    assert due_words(client) == ["blau"]
+
+    # Missed again in a normal quiz: due right away
+    client.post("/save_failure", json={"category": "colors", "word": "rot", "english": "red"})
+    assert due_count(client) == 2
+
+
+def test_due_words_ignore_the_postgres_time_zone(postgres_db):
+    cur = postgres_db.cursor()
+
+    # CURRENT_TIMESTAMP is 14 hours ahead of UTC here
+    cur.execute("SET TIME ZONE 'Pacific/Kiritimati'")
+    cur.execute("INSERT INTO users (username, hash) VALUES ('tz', 'x') RETURNING id")
+    user_id = cur.fetchone()["id"]
+
+    now = utcnow()
+    for word, due_at in (("rot", now - timedelta(hours=1)), ("blau", now + timedelta(hours=1))):
+        cur.execute("""
+            INSERT INTO failed_words (user_id, category, word, due_at) VALUES (%s, 'colors', %s, %s)
+        """, (user_id, word, due_at))
+
+    assert run_named(postgres_db, "failed_words_count", (utcnow(), user_id), "postgres").fetchone()["due"] == 1
+
+    rows = run_named(postgres_db, "due_failed_words", (user_id, utcnow(), 20), "postgres").fetchall()
+    assert [row["word"] for row in rows] == ["rot"]
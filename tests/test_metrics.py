@@ -0,0 +1,19 @@
+import app as app_module
+
+
+def test_metrics_only_from_loopback_without_token(app, monkeypatch):
+    monkeypatch.setattr(app_module, "METRICS_TOKEN", None)
+    client = app.test_client()
+
+    assert client.get("/metrics", environ_base={"REMOTE_ADDR": "203.0.113.5"}).status_code == 404
+    assert client.get("/metrics", environ_base={"REMOTE_ADDR": "127.0.0.1"}).status_code == 200
+
+
+def test_metrics_token(app, monkeypatch):
+    monkeypatch.setattr(app_module, "METRICS_TOKEN", "s3cret")
+    client = app.test_client()
+    remote = {"REMOTE_ADDR": "203.0.113.5"}
+
+    assert client.get("/metrics", environ_base=remote).status_code == 401
+    assert client.get("/metrics", environ_base=remote, headers={"Authorization": "Bearer wrong"}).status_code == 401
+    assert client.get("/metrics", environ_base=remote, headers={"Authorization": "Bearer s3cret"}).status_code == 200
@@ -0,0 +1,81 @@
+import pytest
+
+from queries import compile_sql, run_named
+
+SETTINGS = ("user_id", "sound_enabled", "theme", "custom_color", "speedrun_enabled",
+            "strict_articles", "show_examples", "plurals", "force_umlauts")
+
+
+def test_compile_sql_per_dialect():
+    sql = "SELECT 1 WHERE a = %s AND b = %s"
+    assert compile_sql(sql, "sqlite") == ("SELECT 1 WHERE a = ? AND b = ?", None)
+    assert compile_sql(sql, "postgres") == (sql, None)
+    assert compile_sql(sql, "numeric") == ("SELECT 1 WHERE a = $1 AND b = $2", None)
+
+    # Named parameters are numbered once, in order of first use
+    sql = "SELECT 1 WHERE a = %(x)s AND b = %(y)s AND c = %(x)s"
+    assert compile_sql(sql, "sqlite") == ("SELECT 1 WHERE a = :x AND b = :y AND c = :x", None)
+    assert compile_sql(sql, "numeric") == ("SELECT 1 WHERE a = $1 AND b = $2 AND c = $1", ["x", "y"])
+
+
+def create_user_with_settings(db):
+    cur = db.cursor()
+    cur.execute("INSERT INTO users (username, hash) VALUES ('prepared', 'x') RETURNING id")
+    user_id = cur.fetchone()["id"]
+    cur.execute("INSERT INTO user_settings (user_id, theme) VALUES (%s, 'dark')", (user_id,))
+    db.commit()
+    return user_id
+
+
+def prepared_statements(db):
+    cur = db.cursor()
+    cur.execute("SELECT name FROM pg_prepared_statements")
+    return {row["name"] for row in cur.fetchall()}
+
+
+def test_statements_are_prepared_once_per_connection(postgres_db):
+    user_id = create_user_with_settings(postgres_db)
+
+    for _ in range(3):
+        row = run_named(postgres_db, "user_settings", (user_id,), "postgres", prepare=True).fetchone()
+        assert row["theme"] == "dark"
+
+    # Named parameters go through EXECUTE in the compiled order
+    user = run_named(postgres_db, "award_xp", {
+        "today": "2026-03-10", "yesterday": "2026-03-09", "xp_gain": 10,
+        "now": "2026-03-10 12:00:00", "user_id": user_id,
+    }, "postgres", prepare=True).fetchone()
+    assert (user["xp"], user["streak"]) == (10, 1)
+
+    assert postgres_db.prepared == {"q_user_settings", "q_award_xp"}
+    assert prepared_statements(postgres_db) == {"q_user_settings", "q_award_xp"}
+
+
+def test_prepared_settings_query_survives_a_new_column(postgres_db):
+    user_id = create_user_with_settings(postgres_db)
+    run_named(postgres_db, "user_settings", (user_id,), "postgres", prepare=True)
+
+    postgres_db.cursor().execute("ALTER TABLE user_settings ADD COLUMN extra TEXT")
+    postgres_db.commit()
+
+    row = run_named(postgres_db, "user_settings", (user_id,), "postgres", prepare=True).fetchone()
+    assert tuple(row) == SETTINGS
+
+
+def test_stale_prepared_statement_is_prepared_again(postgres_db):
+    import psycopg2.errors
+
+    user_id = create_user_with_settings(postgres_db)
+    run_named(postgres_db, "user_settings", (user_id,), "postgres", prepare=True)
+
+    # Changing the type of a returned column invalidates the cached plan
+    postgres_db.cursor().execute("ALTER TABLE user_settings ALTER COLUMN theme TYPE VARCHAR(40)")
+    postgres_db.commit()
+
+    with pytest.raises(psycopg2.errors.FeatureNotSupported):
+        run_named(postgres_db, "user_settings", (user_id,), "postgres", prepare=True)
+    postgres_db.rollback()
+
+    row = run_named(postgres_db, "user_settings", (user_id,), "postgres", prepare=True).fetchone()
+    assert row["theme"] == "dark"
+    assert postgres_db.stale == set()
@@ -0,0 +1,111 @@
+from datetime import datetime
+
+import pytest
+
+from rankings import MemoryRanking, RedisRanking
+
+
+def user(user_id, xp, level=1, streak=0):
+    return {
+        "id": user_id, "username": f"user{user_id}", "level": level, "xp": xp,
+        "streak": streak, "country": None, "created_at": datetime(2026, 1, 1),
+    }
+
+
+USERS = [user(1, 10), user(2, 30), user(3, 20)]
+
+
+def usernames(ranking):
+    return [row["username"] for row in ranking.page(0, 100)]
+
+
+class Loader:
+    def __init__(self, users):
+        self.users = users
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return list(self.users)
+
+
+def test_memory_ranking_loads_once_and_updates_incrementally():
+    ranking = MemoryRanking(refresh_interval=0)
+    loader = Loader(USERS)
+    changes = lambda since: ([], [])
+
+    ranking.ensure_loaded(loader, changes)
+    assert usernames(ranking) == ["user2", "user3", "user1"]
+
+    ranking.update(user(1, 40))
+    ranking.ensure_loaded(loader, changes)
+
+    assert usernames(ranking) == ["user1", "user2", "user3"]
+    assert ranking.rank(3) == 3
+    assert loader.calls == 1
+
+
+def test_memory_ranking_catches_up_with_other_workers():
+    ranking = MemoryRanking(refresh_interval=0)
+    loader = Loader(USERS)
+    ranking.ensure_loaded(loader)
+
+    # Another worker saved a score for user 3 and registered user 4
+    changed = [user(3, 50), user(4, 5)]
+    ranking.ensure_loaded(loader, lambda since: (changed, []))
+
+    assert usernames(ranking) == ["user3", "user2", "user1", "user4"]
+
+    # Another worker deleted user 2 and registered user 5 in the same window
+    ranking.ensure_loaded(loader, lambda since: ([user(5, 15)], [2]))
+
+    assert usernames(ranking) == ["user3", "user5", "user1", "user4"]
+    assert ranking.rank(2) is None
+    assert loader.calls == 1
+
+
+@pytest.fixture
+def redis_ranking():
+    fakeredis = pytest.importorskip("fakeredis")
+    return RedisRanking(fakeredis.FakeRedis(decode_responses=True), prefix="test-rankings")
+
+
+def test_redis_ranking_keeps_updates_made_during_a_build(redis_ranking):
+    redis_ranking.ensure_loaded(Loader(USERS))
+    assert usernames(redis_ranking) == ["user2", "user3", "user1"]
+
+    def loader():
+        # The rows are read, then another worker saves a score and deletes an
+        # account before the new ranking is swapped in
+        rows = list(USERS)
+        redis_ranking.update(user(1, 99))
+        redis_ranking.remove(3)
+        return rows
+
+    redis_ranking.invalidate()
+    redis_ranking.ensure_loaded(loader)
+
+    assert usernames(redis_ranking) == ["user1", "user2"]
+    assert redis_ranking.rank(1) == 1
+    assert redis_ranking.rank(3) is None
+    assert not redis_ranking.redis.exists(redis_ranking.pending_key, redis_ranking.lock_key)
+
+
+def test_redis_ranking_is_only_built_when_missing(redis_ranking):
+    loader = Loader(USERS)
+    redis_ranking.ensure_loaded(loader)
+    redis_ranking.update(user(4, 25))
+    redis_ranking.ensure_loaded(loader)
+
+    assert loader.calls == 1
+    assert usernames(redis_ranking) == ["user2", "user4", "user3", "user1"]
+
+
+def test_profile_rank_matches_the_database_count(app, client):
+    import app as app_module
+
+    with app.app_context():
+        db = app_module.get_db()
+        for row in app_module.execute(db, "SELECT id FROM users").fetchall():
+            counted = app_module.run_query(db, "user_rank", (row["id"],)).fetchone()["rank"]
+            assert app_module.get_user_rank(row["id"]) == counted
@@ -0,0 +1,177 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from app import score_xp
+from db_pool import sqlite_connect
+from migrations import migrate
+from queries import run_named
+
+# save_score used to update the streak, look up the best score and write XP
+# and level in separate queries. It now runs save_best_score and award_xp from
+# queries.py. Both versions are run side by side on two identical users and
+# have to leave the same rows behind.
+
+TODAY = date(2026, 3, 10)
+CATEGORY = "colors"
+
+
+@pytest.fixture(params=["sqlite", "postgres"])
+def database(request, tmp_path):
+    if request.param == "sqlite":
+        db = sqlite_connect(str(tmp_path / "scores.db"))()
+        migrate(db, "sqlite", log=lambda *args: None)
+        yield db, "sqlite"
+        db.close()
+        return
+
+    yield request.getfixturevalue("postgres_db"), "postgres"
+
+
+def query(db, dialect, sql, params=()):
+    cur = db.cursor()
+    cur.execute(sql.replace("%s", "?") if dialect == "sqlite" else sql, params)
+    return cur
+
+
+def create_user(db, dialect, username, xp=0, level=1, next_level_xp=120, streak=0, last_active=None):
+    query(db, dialect, """
+        INSERT INTO users (username, hash, xp, level, next_level_xp, streak, last_active)
+        VALUES (%s, 'x', %s, %s, %s, %s, %s)
+    """, (username, xp, level, next_level_xp, streak, last_active))
+    return query(db, dialect, "SELECT id FROM users WHERE username = %s", (username,)).fetchone()["id"]
+
+
+def old_save_score(db, dialect, user_id, score, time, today):
+    # The queries save_score ran before the single-statement version
+
+    # update_streak()
+    user = query(db, dialect, "SELECT streak, last_active FROM users WHERE id = %s", (user_id,)).fetchone()
+
+    if not user["last_active"]:
+        query(db, dialect, "UPDATE users SET streak = 1, last_active = %s WHERE id = %s", (today, user_id))
+    else:
+        last = datetime.strptime(str(user["last_active"]), "%Y-%m-%d").date()
+        if last != today:
+            new_streak = user["streak"] + 1 if last == today - timedelta(days=1) else 1
+            query(db, dialect, "UPDATE users SET streak = %s, last_active = %s WHERE id = %s",
+                (new_streak, today, user_id))
+
+    existing = query(db, dialect, "SELECT * FROM scores WHERE user_id = %s AND category = %s",
+        (user_id, CATEGORY)).fetchone()
+
+    if existing:
+        if not (score > existing["best_score"] or (score == existing["best_score"] and time < existing["best_time"])):
+            return False
+        query(db, dialect, "UPDATE scores SET best_score = %s, best_time = %s WHERE id = %s",
+            (score, time, existing["id"]))
+    else:
+        query(db, dialect, "INSERT INTO scores (user_id, category, best_score, best_time) VALUES (%s, %s, %s, %s)",
+            (user_id, CATEGORY, score, time))
+
+    user = query(db, dialect, "SELECT xp, level, next_level_xp FROM users WHERE id = %s", (user_id,)).fetchone()
+    current_xp = user["xp"] + score_xp(CATEGORY, score, time)
+    level = user["level"]
+    next_req = user["next_level_xp"]
+
+    while current_xp >= next_req:
+        current_xp -= next_req
+        level += 1
+        next_req = int(next_req * 1.25)
+
+    query(db, dialect, "UPDATE users SET xp = %s, level = %s, next_level_xp = %s WHERE id = %s",
+        (current_xp, level, next_req, user_id))
+    return True
+
+
+def new_save_score(db, dialect, user_id, score, time, today):
+    # What save_score runs now (app.py and asgi.py)
+    prepare = dialect == "postgres"
+
+    record = run_named(db, "save_best_score", (user_id, CATEGORY, score, time), dialect, prepare).fetchone()
+    earned_new_record = record is not None
+
+    user = run_named(db, "award_xp", {
+        "today": today,
+        "yesterday": today - timedelta(days=1),
+        "xp_gain": score_xp(CATEGORY, score, time) if earned_new_record else 0,
+        "now": datetime.now(),
+        "user_id": user_id
+    }, dialect, prepare).fetchone()
+
+    assert user["xp"] < user["next_level_xp"]
+    return earned_new_record
+
+
+def state(db, dialect, user_id):
+    user = query(db, dialect, """
+        SELECT xp, level, next_level_xp, streak, last_active FROM users WHERE id = %s
+    """, (user_id,)).fetchone()
+    scores = query(db, dialect, """
+        SELECT category, best_score, best_time FROM scores WHERE user_id = %s ORDER BY category
+    """, (user_id,)).fetchall()
+
+    user = dict(user, last_active=str(user["last_active"]) if user["last_active"] else None)
+    return user, [dict(row) for row in scores]
+
+
+def assert_same(db, dialect, plays, **user):
+    # plays: (days after TODAY, score, time)
+    old_id = create_user(db, dialect, "old", **user)
+    new_id = create_user(db, dialect, "new", **user)
+
+    for days, score, time in plays:
+        today = TODAY + timedelta(days=days)
+        old = old_save_score(db, dialect, old_id, score, time, today)
+        new = new_save_score(db, dialect, new_id, score, time, today)
+
+        assert old == new
+        assert state(db, dialect, old_id) == state(db, dialect, new_id)
+
+    db.commit()
+    return state(db, dialect, new_id)
+
+
+def test_first_play_starts_streak(database):
+    user, scores = assert_same(*database, [(0, 10, 50)])
+
+    assert user["streak"] == 1
+    assert user["last_active"] == str(TODAY)
+    assert scores == [{"category": CATEGORY, "best_score": 10, "best_time": 50}]
+
+
+@pytest.mark.parametrize("last_active, streak", [
+    (TODAY, 4),                         # already played today: kept
+    (TODAY - timedelta(days=1), 5),     # yesterday: continued
+    (TODAY - timedelta(days=2), 1),     # missed a day: reset
+])
+def test_streak_day_boundary(database, last_active, streak):
+    user, _ = assert_same(*database, [(0, 5, 100)], streak=4, last_active=last_active)
+    assert user["streak"] == streak
+
+
+def test_streak_over_several_days(database):
+    user, _ = assert_same(*database, [(0, 5, 100), (0, 6, 100), (1, 7, 100), (2, 3, 100), (4, 8, 100)])
+    assert user["streak"] == 1
+
+
+def test_single_level_up(database):
+    user, _ = assert_same(*database, [(0, 12, 30)], xp=100, next_level_xp=120)
+    assert user["level"] == 2
+
+
+def test_several_level_ups(database):
+    user, _ = assert_same(*database, [(0, 12, 30)], xp=25, next_level_xp=30)
+    assert user["level"] >= 3
+
+
+def test_many_level_ups_on_a_flat_curve(database):
+    # int(3 * 1.25) == 3, so every 3 XP is another level
+    user, _ = assert_same(*database, [(0, 12, 30), (1, 11, 20)], next_level_xp=3)
+    assert user["level"] > 20
+
+
+def test_best_score_upsert(database):
+    # worse score, same score slower, same score faster, better score
+    _, scores = assert_same(*database, [(0, 8, 60), (0, 6, 20), (0, 8, 70), (0, 8, 45), (0, 12, 90)])
+    assert scores == [{"category": CATEGORY, "best_score": 12, "best_time": 90}]
@@ -0,0 +1,120 @@
+import json, os, random
+from collections import namedtuple
+
+# All vocabulary from static/data, loaded once per process.
+# Entries are kept as compact tuples and indexed by level, category,
+# grammatical gender and (lowercased) German word.
+
+VocabEntry = namedtuple("VocabEntry", "level category german english plural example gender")
+
+ARTICLE_GENDERS = {"der": "m", "die": "f", "das": "n"}
+
+
+def noun_gender(entry):
+    if entry.gender:
+        return entry.gender.lower()
+
+    article = entry.german.split(" ", 1)[0].lower()
+    return ARTICLE_GENDERS.get(article)
+
+
+def entry_to_dict(entry, with_category=False):
+    # Same shape as the JSON files (optional fields left out when empty)
+    item = {"german": entry.german, "english": entry.english}
+
+    if entry.plural:
+        item["plural"] = entry.plural
+    if entry.example:
+        item["example"] = entry.example
+    if entry.gender:
+        item["gender"] = entry.gender
+    if with_category:
+        item["category"] = entry.category
+
+    return item
+
+
+class VocabStore:
+    def __init__(self, base_path="static/data"):
+        self.base_path = base_path
+        self.load()
+
+    def load(self):
+        entries = []
+        by_level = {}
+        by_category = {}
+        by_gender = {}
+        by_word = {}
+
+        for level in sorted(os.listdir(self.base_path)):
+            level_path = os.path.join(self.base_path, level)
+
+            if not os.path.isdir(level_path):
+                continue
+
+            by_level[level] = []
+
+            for file in sorted(os.listdir(level_path)):
+                if not file.endswith(".json"):
+                    continue
+
+                category = file[:-5]
+                with open(os.path.join(level_path, file), "r", encoding="utf8") as f:
+                    data = json.load(f)
+
+                words = []
+                for item in data:
+                    entry = VocabEntry(
+                        level,
+                        category,
+                        item["german"],
+                        item["english"],
+                        item.get("plural"),
+                        item.get("example"),
+                        item.get("gender")
+                    )
+                    words.append(entry)
+                    by_word.setdefault(entry.german.lower(), []).append(entry)
+
+                    gender = noun_gender(entry)
+                    if gender:
+                        by_gender.setdefault((level, gender), []).append(entry)
+
+                entries.extend(words)
+                by_level[level].extend(words)
+                by_category[(level, category)] = words
+
+        self.entries = entries
+        self.by_level = by_level
+        self.by_category = by_category
+        self.by_gender = by_gender
+        self.by_word = by_word
+
+    def levels(self):
+        return list(self.by_level)
+
+    def categories(self, level):
+        return [cat for (lvl, cat) in self.by_category if lvl == level]
+
+    def category_sizes(self):
+        return {f"{level}_{cat}": len(words) for (level, cat), words in self.by_category.items()}
+
+    def words(self, level, category):
+        return self.by_category.get((level, category), [])
+
+    def words_by_gender(self, level, gender):
+        return self.by_gender.get((level, gender), [])
+
+    def lookup(self, german):
+        return self.by_word.get(german.lower(), [])
+
+    def sample(self, level, n, seed=None, categories=None):
+        if categories is None:
+            pool = self.by_level.get(level, [])
+        else:
+            pool = []
+            for cat in categories:
+                pool.extend(self.by_category.get((level, cat), []))
+
+        rng = random.Random(seed) if seed is not None else random
+        return rng.sample(pool, min(n, len(pool)))